@@ -1,11 +1,24 @@
 import os
 import time
 import traceback
-from extraction.resume_extraction import process_resumes as extract_all_resumes
-from extraction.jd_extraction import process_jds as extract_all_jds
-from embedding.resume_embedding import embed_all_jsons_from_folder as embed_resumes
+from concurrent.futures import ThreadPoolExecutor
+from extraction.resume_extraction import process_resumes as extract_all_resumes, extract_resumes, LLMResumeParser
+from extraction.jd_extraction import process_jds as extract_all_jds, extract_jds, LLMJDParser
+from embedding.resume_embedding import embed_all_jsons_from_folder as embed_resumes, init_chromadb, sanitize_collection_name
 from embedding.jd_embedding import embed_all_jsons_from_folder as embed_jds
-from compare.llm import main as run_llm_comparison
+from embedding.batch import embed_fields
+from embedding.talent_pool import (
+    CANDIDATE_COLLECTION, JD_COLLECTION, add_documents, add_run_to_pool, get_document_fields, search,
+)
+from compare.llm import compare_documents, compare_pair, docs_from_fields
+from compare.vector_scoring import score_pairs
+from compare.similarity import get_collection_fields
+from utils.validation import validate_analysis
+
+SCORING_MODES = ("llm", "fast")
+# Write each stage's output to JSON files and per-run Chroma stores, mainly for debugging;
+# otherwise parsed fields and embeddings are handed between stages in memory
+PIPELINE_PERSIST = os.getenv("PIPELINE_PERSIST", "false").lower() == "true"
 
 def timed_step(step_name, func, *args, **kwargs):
     print(f"\n[STEP] {step_name}...")
@@ -19,9 +32,24 @@ def timed_step(step_name, func, *args, **kwargs):
         traceback.print_exc()
         return None
 
-def main(resume_folder, jd_folder):
-    print("\n=== Starting Resume Shortlisting Pipeline ===")
+def report_stage(progress, stage, status):
+    if progress is None:
+        return
+    try:
+        progress(stage, status)
+    except Exception as e:
+        print(f"[WARNING] Progress callback failed for {stage}: {e}")
 
+def load_store_fields(store):
+    return {c.name: get_collection_fields(store, c.name) for c in store.list_collections()}
+
+def extract_documents(extract, folder):
+    """Run an in-memory extractor and key its parsed fields by collection name."""
+    documents, _ = extract(folder)
+    return {sanitize_collection_name(os.path.basename(path)): fields for path, fields in documents.items()}
+
+def persisted_stages(resume_folder, jd_folder, progress, jd_fields=None):
+    """Extraction and embedding through JSON files and per-run Chroma stores."""
     resume_json = os.path.join(resume_folder, "json_resume")
     jd_json = os.path.join(jd_folder, "json_jd")
 
@@ -33,19 +61,144 @@ def main(resume_folder, jd_folder):
     os.makedirs(chroma_resume, exist_ok=True)
     os.makedirs(chroma_jd, exist_ok=True)
 
+    # One client per vector store, shared by embedding and the read-back below
+    resume_store = init_chromadb(chroma_resume)
+    jd_store = init_chromadb(chroma_jd)
+
+    report_stage(progress, "extraction", "running")
     timed_step("Resume Extraction", extract_all_resumes, resume_folder, resume_json)
-    timed_step("JD Extraction", extract_all_jds, jd_folder, jd_json)
-    timed_step("Resume Embedding", embed_resumes, resume_json, chroma_resume)
-    timed_step("JD Embedding", embed_jds, jd_json, chroma_jd)
+    if jd_fields is None:
+        timed_step("JD Extraction", extract_all_jds, jd_folder, jd_json)
+    report_stage(progress, "extraction", "completed")
+
+    report_stage(progress, "embedding", "running")
+    timed_step("Resume Embedding", embed_resumes, resume_json, chroma_resume, client=resume_store)
+    if jd_fields is None:
+        timed_step("JD Embedding", embed_jds, jd_json, chroma_jd, client=jd_store)
+        jd_fields = load_store_fields(jd_store)
+    return load_store_fields(resume_store), jd_fields
+
+def in_memory_stages(resume_folder, jd_folder, progress, jd_fields=None):
+    """Extraction and embedding with parsed dicts and vectors passed straight to the next stage."""
+    report_stage(progress, "extraction", "running")
+    resume_docs = timed_step("Resume Extraction", extract_documents, extract_resumes, resume_folder) or {}
+    if jd_fields is None:
+        jd_docs = timed_step("JD Extraction", extract_documents, extract_jds, jd_folder) or {}
+    report_stage(progress, "extraction", "completed")
+
+    report_stage(progress, "embedding", "running")
+    resume_fields = timed_step("Resume Embedding", embed_fields, resume_docs) or {}
+    if jd_fields is None:
+        jd_fields = timed_step("JD Embedding", embed_fields, jd_docs) or {}
+    return resume_fields, jd_fields
+
+def main(resume_folder, jd_folder, progress=None, on_result=None, top_k=None, min_similarity=None,
+         scoring_mode="llm", persist=None, jd_fields=None):
+    """
+    Run extraction, embedding and comparison for every resume against every JD.
+
+    Pass `jd_fields` ({name: {field: {"document", "embedding"}}}, e.g. from
+    load_registered_jd) to score against already-parsed JDs instead of `jd_folder`.
+    """
+    if scoring_mode not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode '{scoring_mode}', expected one of {SCORING_MODES}")
+    persist = PIPELINE_PERSIST if persist is None else persist
+
+    print("\n=== Starting Resume Shortlisting Pipeline ===")
+
+    stages = persisted_stages if persist else in_memory_stages
+    resume_fields, jd_fields = stages(resume_folder, jd_folder, progress, jd_fields=jd_fields)
+    pool_ids = timed_step("Talent Pool Indexing", add_run_to_pool, resume_fields, jd_fields) or {}
+    report_stage(progress, "embedding", "completed")
 
-    results = timed_step("LLM-Based Comparison", run_llm_comparison, chroma_resume, chroma_jd)
-    print("[RESULTS] LLM Comparison Results:")
+    report_stage(progress, "comparison", "running")
+    if on_result:
+        caller_on_result = on_result
+
+        def on_result(resume_name, jd_name, parsed, details=None):
+            details = dict(details or {})
+            details["candidate_id"] = pool_ids.get("candidates", {}).get(resume_name)
+            details["jd_id"] = pool_ids.get("job_descriptions", {}).get(jd_name)
+            caller_on_result(resume_name, jd_name, parsed, details)
+
+    if scoring_mode == "fast":
+        results = timed_step("Vector-Based Comparison", score_pairs, resume_fields, jd_fields,
+                             on_result=on_result, top_k=top_k, min_similarity=min_similarity)
+    else:
+        results = timed_step("LLM-Based Comparison", compare_documents, resume_fields, jd_fields,
+                             on_result=on_result, top_k=top_k, min_similarity=min_similarity)
+    report_stage(progress, "comparison", "completed" if results else "failed")
+    print("[RESULTS] Comparison Results:")
     if results:
         for result in results:
             print(result)
             print("-" * 100)
     print("\n=== Pipeline Completed ===")
     if not results or not isinstance(results, list):
-        raise RuntimeError("LLM did not return valid results")
+        raise RuntimeError("Comparison stage did not return valid results")
+
+    return results
+
+def match_resume_to_jds(resume_path, top_k=10, llm_top_n=0):
+    """Rank indexed JDs for one resume by field similarity, optionally LLM-scoring the best few."""
+    print("\n=== Matching resume against the JD index ===")
+    parser = LLMResumeParser()
+    resume_name = sanitize_collection_name(os.path.basename(resume_path))
+
+    text = timed_step("Resume Text Extraction", parser.extract_text_from_file, resume_path)
+    if not text or not text.strip():
+        raise ValueError("Resume is empty or unreadable")
+    parsed = timed_step("Resume Extraction", parser.extract_fields, text)
+    if not parsed:
+        raise ValueError("Could not extract fields from the resume")
+
+    resume_fields = embed_fields({resume_name: parsed})[resume_name]
+    candidate_id = add_documents(CANDIDATE_COLLECTION, {resume_name: resume_fields}).get(resume_name)
+
+    matches = search(JD_COLLECTION, {f: e["embedding"] for f, e in resume_fields.items()}, top_k=top_k)
+
+    to_score = matches[:llm_top_n]
+    if to_score:
+        resume_docs = docs_from_fields(resume_fields)
+
+        def score(match):
+            jd_name, jd_fields = get_document_fields(JD_COLLECTION, match["id"])
+            comparison_name = f"{resume_name}_vs_{jd_name or match['id']}"
+            parsed = compare_pair(comparison_name, resume_docs, docs_from_fields(jd_fields)) or {}
+            raw = parsed.get(comparison_name)
+            if raw is None and len(parsed) == 1:
+                raw = next(iter(parsed.values()))
+            return validate_analysis(raw or {})
+
+        with ThreadPoolExecutor(max_workers=len(to_score)) as executor:
+            for match, analysis in zip(to_score, executor.map(score, to_score)):
+                match["analysis"] = analysis
+
+    return {"candidate_id": candidate_id, "resume": resume_name, "matches": matches}
+
+def register_jd(jd_path):
+    """Parse and embed one JD into the talent pool; returns the fields to keep in the JD registry."""
+    print("\n=== Registering job description ===")
+    parser = LLMJDParser()
+    filename = os.path.basename(jd_path)
+    jd_name = sanitize_collection_name(filename)
+
+    text = timed_step("JD Text Extraction", parser.extract_text_from_file, jd_path)
+    if not text or not text.strip():
+        raise ValueError("Job description is empty or unreadable")
+    parsed = timed_step("JD Extraction", parser.extract_fields, text)
+    if not parsed:
+        raise ValueError("Could not extract fields from the job description")
+
+    fields = embed_fields({jd_name: parsed})[jd_name]
+    jd_id = add_documents(JD_COLLECTION, {jd_name: fields}).get(jd_name)
+    return {"_id": jd_id, "name": jd_name, "filename": filename, "fields": parsed}
 
-    return results
\ No newline at end of file
+def load_registered_jd(registered):
+    """Return {name: {field: {"document", "embedding"}}} for a registry entry, reusing its pooled vectors."""
+    _, fields = get_document_fields(JD_COLLECTION, registered["_id"])
+    if not fields:
+        # The talent pool was rebuilt without it; the registry kept the parsed fields, so only re-embed
+        fields = embed_fields({registered["name"]: registered["fields"]})[registered["name"]]
+        add_documents(JD_COLLECTION, {registered["name"]: fields})
+    return {registered["name"]: fields}
@@ -0,0 +1,126 @@
+"""
+Recall@K and query latency of the talent-pool HNSW index against exact search.
+
+Builds an in-memory Chroma collection with the same HNSW settings as
+embedding.talent_pool, fills it with synthetic clustered unit vectors tagged
+with the resume field names, and replays field-filtered queries against both
+the index and a brute-force NumPy scan.
+
+    python -m benchmarks.ann_benchmark --sizes 10000 100000 1000000
+    python -m benchmarks.ann_benchmark --sizes 100000 --search-ef 64 128 256
+"""
+import time
+import argparse
+import numpy as np
+import chromadb
+from embedding.talent_pool import SEARCH_FIELDS, hnsw_metadata
+
+FIELDS = SEARCH_FIELDS + ["other information"]
+INSERT_BATCH = 5000
+
+def synthetic_vectors(n, dim, clusters, rng):
+    """Clustered unit vectors, closer to real field embeddings than uniform noise."""
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def build_collection(vectors, fields, m, construction_ef, search_ef):
+    client = chromadb.EphemeralClient()
+    name = f"bench-{len(vectors)}-{m}-{construction_ef}"
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    collection = client.create_collection(name=name, metadata=hnsw_metadata(m, construction_ef, search_ef))
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), INSERT_BATCH):
+        batch = vectors[offset:offset + INSERT_BATCH]
+        collection.add(
+            ids=[str(i) for i in range(offset, offset + len(batch))],
+            embeddings=batch.tolist(),
+            metadatas=[{"field": fields[i]} for i in range(offset, offset + len(batch))],
+        )
+    return collection, time.perf_counter() - start
+
+def split_by_field(vectors, fields):
+    """{field: (its vectors, their row ids)}, built once so the exact timer only measures the scan."""
+    field_array = np.array(fields)
+    by_field = {}
+    for field in set(fields):
+        ids = np.flatnonzero(field_array == field)
+        by_field[field] = (np.ascontiguousarray(vectors[ids]), ids)
+    return by_field
+
+def exact_top_k(field_vectors, ids, query, k):
+    sims = field_vectors @ query
+    idx = np.argpartition(-sims, min(k, len(sims) - 1))[:k]
+    return set(ids[idx].tolist())
+
+def run(size, dim, k, queries, m, construction_ef, search_efs, clusters, seed):
+    rng = np.random.default_rng(seed)
+    vectors = synthetic_vectors(size, dim, clusters, rng)
+    fields = [FIELDS[i % len(FIELDS)] for i in range(size)]
+    by_field = split_by_field(vectors, fields)
+    query_vectors = synthetic_vectors(queries, dim, clusters, rng)
+    query_fields = [SEARCH_FIELDS[i % len(SEARCH_FIELDS)] for i in range(queries)]
+
+    collection, build_seconds = build_collection(vectors, fields, m, construction_ef, search_efs[0])
+    print(f"\n[INFO] n={size:,} dim={dim} M={m} construction_ef={construction_ef}: built in {build_seconds:.1f}s")
+
+    exact_latencies = []
+    truth = []
+    for query, field in zip(query_vectors, query_fields):
+        field_vectors, ids = by_field[field]
+        start = time.perf_counter()
+        truth.append(exact_top_k(field_vectors, ids, query, k))
+        exact_latencies.append(time.perf_counter() - start)
+
+    for search_ef in search_efs:
+        if search_ef != search_efs[0]:
+            try:
+                collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+            except TypeError:
+                # Chroma releases before the configuration API only take search_ef at creation
+                collection, _ = build_collection(vectors, fields, m, construction_ef, search_ef)
+        latencies = []
+        recalls = []
+        for query, field, expected in zip(query_vectors, query_fields, truth):
+            start = time.perf_counter()
+            result = collection.query(
+                query_embeddings=[query.tolist()], n_results=k, where={"field": field}, include=[]
+            )
+            latencies.append(time.perf_counter() - start)
+            recalls.append(len(expected & set(int(i) for i in result["ids"][0])) / k)
+
+        print(
+            f"  search_ef={search_ef:<4} recall@{k}={np.mean(recalls):.3f}  "
+            f"ann p50={np.percentile(latencies, 50) * 1000:.2f}ms p95={np.percentile(latencies, 95) * 1000:.2f}ms  "
+            f"exact p50={np.percentile(exact_latencies, 50) * 1000:.2f}ms"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 output size")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--m", type=int, default=None)
+    parser.add_argument("--construction-ef", type=int, default=None)
+    parser.add_argument("--search-ef", type=int, nargs="+", default=None)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    defaults = hnsw_metadata()
+    m = args.m or defaults["hnsw:M"]
+    construction_ef = args.construction_ef or defaults["hnsw:construction_ef"]
+    search_efs = args.search_ef or [defaults["hnsw:search_ef"]]
+
+    for size in args.sizes:
+        run(size, args.dim, args.k, args.queries, m, construction_ef, search_efs, args.clusters, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os
+from utils.cache import CACHE_DIR, SQLiteCache, hash_key
+
+COMPARISON_CACHE_PATH = os.getenv("COMPARISON_CACHE_PATH", os.path.join(CACHE_DIR, "comparison.sqlite"))
+COMPARISON_CACHE_MAX_MB = float(os.getenv("COMPARISON_CACHE_MAX_MB", 128))
+COMPARISON_CACHE_TTL_HOURS = float(os.getenv("COMPARISON_CACHE_TTL_HOURS", 24 * 30))
+
+comparison_cache = SQLiteCache(
+    COMPARISON_CACHE_PATH,
+    max_bytes=int(COMPARISON_CACHE_MAX_MB * 1024 * 1024),
+    ttl=COMPARISON_CACHE_TTL_HOURS * 3600 or None,
+)
+
+def comparison_cache_key(resume_docs, jd_docs, model_name, prompt_ver):
+    """Key on document content rather than file names, so renamed re-uploads still hit."""
+    return hash_key(hash_key(*resume_docs), hash_key(*jd_docs), model_name, prompt_ver)
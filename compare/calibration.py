@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from utils.validation import SHORTLIST_THRESHOLD, find_analysis
+
+CALIBRATION_PATH = os.getenv("CALIBRATION_PATH", "calibration.json")
+CALIBRATION_MIN_SAMPLES = int(os.getenv("CALIBRATION_MIN_SAMPLES", 30))
+# How many residual standard deviations a prediction must clear the threshold by before the LLM is skipped
+CASCADE_Z = float(os.getenv("CASCADE_Z", 2.0))
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "true").lower() == "true"
+# Folds for the held-out agreement estimate reported when fitting
+CALIBRATION_FOLDS = int(os.getenv("CALIBRATION_FOLDS", 5))
+
+def extract_overall(result):
+    """Pull OverallMatchPercentage out of a stored record's dynamic `<resume>_vs_<jd>` key."""
+    analysis = find_analysis(result)
+    if analysis is None:
+        return None
+    try:
+        return float(analysis["OverallMatchPercentage"])
+    except (TypeError, ValueError):
+        return None
+
+def load_samples(collection):
+    """Return (embedding_scores, llm_scores) for records that were actually scored by the LLM."""
+    cursor = collection.find(
+        {"embedding_score": {"$ne": None}, "decided_by": "llm"},
+        {"_id": 0, "embedding_score": 1, "result": 1},
+    )
+    embedding_scores, llm_scores = [], []
+    for doc in cursor:
+        overall = extract_overall(doc.get("result"))
+        if overall is None:
+            continue
+        embedding_scores.append(float(doc["embedding_score"]))
+        llm_scores.append(overall)
+    return np.array(embedding_scores, dtype=np.float64), np.array(llm_scores, dtype=np.float64)
+
+def fit_calibration(embedding_scores, llm_scores):
+    """Least-squares line from embedding score to LLM OverallMatchPercentage, with its residual spread."""
+    slope, intercept = np.polyfit(embedding_scores, llm_scores, deg=1)
+    residuals = llm_scores - (slope * embedding_scores + intercept)
+    return {
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "residual_std": float(residuals.std(ddof=2)) if len(residuals) > 2 else float("inf"),
+        "samples": int(len(embedding_scores)),
+        "threshold": SHORTLIST_THRESHOLD,
+        "fitted_at": time.time(),
+    }
+
+def save_calibration(calibration, path=CALIBRATION_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+
+def load_calibration(path=CALIBRATION_PATH):
+    if not CASCADE_ENABLED or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            calibration = json.load(f)
+    except Exception as e:
+        print(f"[WARNING] Could not read calibration file {path}: {e}")
+        return None
+    if calibration.get("samples", 0) < CALIBRATION_MIN_SAMPLES:
+        return None
+    return calibration
+
+def predict(calibration, embedding_score):
+    score = calibration["slope"] * embedding_score + calibration["intercept"]
+    return float(min(max(score, 0.0), 100.0))
+
+def cascade_decision(calibration, embedding_score, z=None):
+    """Return ("accept" | "reject" | None, predicted_score); None means the pair needs the LLM."""
+    z = z if z is not None else calibration.get("z", CASCADE_Z)
+    predicted = predict(calibration, embedding_score)
+    margin = z * calibration["residual_std"]
+    threshold = calibration.get("threshold", SHORTLIST_THRESHOLD)
+    if predicted - margin > threshold:
+        return "accept", predicted
+    if predicted + margin <= threshold:
+        return "reject", predicted
+    return None, predicted
+
+def agreement_report(calibration, embedding_scores, llm_scores, z=None):
+    decided = agreed = 0
+    for embedding_score, llm_score in zip(embedding_scores, llm_scores):
+        decision, _ = cascade_decision(calibration, embedding_score, z=z)
+        if decision is None:
+            continue
+        decided += 1
+        if (decision == "accept") == (llm_score > calibration["threshold"]):
+            agreed += 1
+    total = len(embedding_scores)
+    return {
+        "samples": total,
+        "decided_without_llm": decided,
+        "skip_rate": round(decided / total, 3) if total else 0.0,
+        "agreement_on_decided": round(agreed / decided, 3) if decided else None,
+        "disagreements": decided - agreed,
+    }
+
+def cross_validated_agreement(embedding_scores, llm_scores, z=None, folds=CALIBRATION_FOLDS, seed=0):
+    """
+    Agreement of the cascade on results it was not fitted on: each fold is
+    decided by a line fitted on the other folds, and the counts are pooled.
+    """
+    order = np.random.default_rng(seed).permutation(len(embedding_scores))
+    total = decided = disagreements = 0
+    for held_out in np.array_split(order, folds):
+        train = np.setdiff1d(order, held_out)
+        calibration = fit_calibration(embedding_scores[train], llm_scores[train])
+        report = agreement_report(calibration, embedding_scores[held_out], llm_scores[held_out], z=z)
+        total += report["samples"]
+        decided += report["decided_without_llm"]
+        disagreements += report["disagreements"]
+    return {
+        "folds": folds,
+        "samples": total,
+        "decided_without_llm": decided,
+        "skip_rate": round(decided / total, 3) if total else 0.0,
+        "agreement_on_decided": round((decided - disagreements) / decided, 3) if decided else None,
+        "disagreements": disagreements,
+    }
+
+def main():
+    from utils.db import collection
+
+    parser = argparse.ArgumentParser(description="Fit the embedding-score cascade against stored LLM results.")
+    parser.add_argument("--output", default=CALIBRATION_PATH, help="where to write the calibration JSON")
+    parser.add_argument("--z", type=float, default=CASCADE_Z, help="residual std devs required to skip the LLM")
+    parser.add_argument("--folds", type=int, default=CALIBRATION_FOLDS, help="folds for the held-out agreement")
+    args = parser.parse_args()
+
+    embedding_scores, llm_scores = load_samples(collection)
+    print(f"[INFO] Loaded {len(embedding_scores)} LLM-scored result(s) with embedding scores")
+    if len(embedding_scores) < CALIBRATION_MIN_SAMPLES:
+        print(f"[ERROR] Need at least {CALIBRATION_MIN_SAMPLES} samples to calibrate")
+        return
+
+    # Agreement is measured on held-out folds; in-sample it would flatter the line it was fitted to
+    held_out = cross_validated_agreement(embedding_scores, llm_scores, z=args.z, folds=args.folds)
+
+    # The saved line uses every sample
+    calibration = fit_calibration(embedding_scores, llm_scores)
+    calibration["z"] = args.z
+    calibration["held_out_agreement"] = held_out
+    save_calibration(calibration, args.output)
+    print(f"[INFO] Calibration: {json.dumps(calibration)}")
+    print(f"[INFO] Held-out agreement with the {SHORTLIST_THRESHOLD}% shortlist threshold "
+          f"({args.folds}-fold): {json.dumps(held_out)}")
+    print(f"[SUCCESS] Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
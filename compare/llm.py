@@ -2,20 +2,44 @@ import os
 import json
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from chromadb import PersistentClient
 from huggingface_hub import InferenceClient
 from dotenv import load_dotenv
+from compare.cache import comparison_cache, comparison_cache_key
+from compare.calibration import cascade_decision, load_calibration
+from compare.similarity import get_collection_fields, select_candidates
+from compare.vector_scoring import field_vectors, score_documents, strip_label
+from utils.cache import prompt_version
+from utils.prompts import PROMPT_CHARS_PER_TOKEN, compact_prompt, estimate_tokens, fit_sections, report_tokens
 load_dotenv()
 
 # Constants
 HF_TOKEN = os.getenv("TOKEN")
 MODEL_NAME = os.getenv("MODEL_NAME")
 FIELD_ORDER = ["Skills", "Education", "Experience", "Job Role"]
+# JSON keys in the order the extraction parsers emit them, matching FIELD_ORDER plus other information
+FIELD_KEYS = ["skill", "education", "experience", "job role", "other information"]
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+# Estimated input tokens per comparison call, system prompt included
+COMPARISON_INPUT_TOKEN_BUDGET = int(os.getenv("COMPARISON_INPUT_TOKEN_BUDGET", 2500))
+# Trim order under the budget, by position in FIELD_KEYS: other information, then experience, education, skill, job role
+TRIM_PRIORITY = {4: 0, 2: 1, 1: 2, 0: 3, 3: 4}
+# Scored fields (everything but other information) are never trimmed below this, on either side
+FIELD_MIN_TOKENS = int(os.getenv("FIELD_MIN_TOKENS", 64))
 
 # Initialize clients
 llm_client = InferenceClient(model=MODEL_NAME, token=HF_TOKEN)
 
 # Prompt Templates
+# One flat line per section instead of the pretty-printed schema; it is sent on every call
+SECTION_SCHEMA = '{"match_pct": float, "resume_value": string, "job_description_value": string, "explanation": string}'
+OUTPUT_SCHEMA = (
+    '{"<comparison key>": {'
+    + ", ".join(f'"{section}": {SECTION_SCHEMA}' for section in ["Skills", "Education", "Job Role", "Experience"])
+    + ', "OverallMatchPercentage": float, "why_overall_match_is_this": string, "AI_Generated_Estimate_Percentage": float}}'
+)
+
 system_prompt = """
 You are a world-class HR, Talent Acquisition, and Generative AI Specialist with deep expertise in job-role alignment, semantic document comparison, and hiring decision automation.
 
@@ -32,6 +56,7 @@ You must return a single valid JSON object in the structure described below.
 - NEVER nest objects inside any field — your output must remain a **flat JSON**.
 - Explanations must be **insightful, human-readable, and professional** — written as if speaking to a hiring manager.
 - Escape any invalid characters like tabs/newlines using `\\t` and `\\n`.
+- No semicolons (;) in values — use periods or commas.
 - Do **not** include any commentary or text outside the JSON.
 
 ### Field Matching Logic:
@@ -50,9 +75,7 @@ You must return a single valid JSON object in the structure described below.
    - Experience that directly meets or exceeds JD expectations should score high (90–100%).
 
 4. **Job Role**
-   - Normalize semantically equivalent titles.
-   - Penalize only when there is **significant deviation** in domain, seniority, or functional focus.
-   Normalize job titles by semantic equivalence, recognizing hierarchical and domain relationships (e.g., "Machine Learning Engineer" matches "Data Scientist" since ML is part of Data Science). Penalize mismatches only if there is significant deviation in domain, seniority, or functional focus (e.g., engineer vs. manager). Prioritize domain relevance and seniority alignment. Explain penalties when applied.
+   - Normalize job titles by semantic equivalence, recognizing hierarchical and domain relationships (e.g., "Machine Learning Engineer" matches "Data Scientist" since ML is part of Data Science). Penalize mismatches only if there is significant deviation in domain, seniority, or functional focus (e.g., engineer vs. manager). Prioritize domain relevance and seniority alignment. Explain penalties when applied.
 
 5. **OverallMatchPercentage**
    - Must be a weighted score calculated **heavily** from Skills, Experience, Education, and Job Role.
@@ -63,87 +86,32 @@ You must return a single valid JSON object in the structure described below.
 
 ### Output Format (strict):
 
-{
-  "{resume_filename}": {
-    "Skills": {
-      "match_pct": float,
-      "resume_value": string,
-      "job_description_value": string,
-      "explanation": string
-    },
-    "Education": {
-      "match_pct": float,
-      "resume_value": string,
-      "job_description_value": string,
-      "explanation": string
-    },
-    "Job Role": {
-      "match_pct": float,
-      "resume_value": string,
-      "job_description_value": string,
-      "explanation": string
-    },
-    "Experience": {
-      "match_pct": float,
-      "resume_value": string,
-      "job_description_value": string,
-      "explanation": string
-    },
-    "OverallMatchPercentage": float,
-    "why_overall_match_is_this": string,
-    "AI_Generated_Estimate_Percentage": float
-  }
-}
+""" + OUTPUT_SCHEMA + """
 
 Return ONLY the JSON object. No extra comments or explanation.
 """
 
-user_prompt_template = """
-Compare the following resume and job description using their parsed field data.
-
-Each field below is populated from the database. Compare them **semantically and intelligently** using the structure below.
-
-Use the following strict JSON format:
-
-{{
-  "{resume_filename}": {{
-    "Skills": {{
-      "match_pct": float,
-      "resume_value": string,
-      "job_description_value": string,
-      "explanation": string
-    }},
-    "Education": {{
-      "match_pct": float,
-      "resume_value": string,
-      "job_description_value": string,
-      "explanation": string
-    }},
-    "Job Role": {{
-      "match_pct": float,
-      "resume_value": string,
-      "job_description_value": string,
-      "explanation": string
-    }},
-    "Experience": {{
-      "match_pct": float,
-      "resume_value": string,
-      "job_description_value": string,
-      "explanation": string
-    }},
-    "OverallMatchPercentage": float,
-    "why_overall_match_is_this": string,
-    "AI_Generated_Estimate_Percentage": float
-  }}
-}}
-
-Return only the JSON object, and ensure:
-- match_pct values reflect real semantic similarity (not keyword count).
-- Explanations are professional, specific, and insightful.
-- No nested JSON objects inside any value fields.
-- No semicolons (;) in values — use periods or commas.
-- No hallucinated info or missing keys.
-"""
+system_prompt = compact_prompt(system_prompt)
+
+# The output schema lives only in the system prompt; the user turn carries the data
+user_prompt_template = """Compare this resume and job description and return the JSON object described above, keyed by "{resume_filename}".
+
+Job Description:
+{jd_text}
+
+Resume:
+{resume_text}
+
+Job Description Other Information:
+{jd_other_info}
+
+Resume Other Information:
+{resume_other_info}"""
+
+PROMPT_VERSION = prompt_version(
+    system_prompt, user_prompt_template, str(COMPARISON_INPUT_TOKEN_BUDGET), str(PROMPT_CHARS_PER_TOKEN),
+    str(FIELD_MIN_TOKENS),
+)
 
 def get_collection_docs(client, collection_name):
     try:
@@ -152,15 +120,24 @@ def get_collection_docs(client, collection_name):
         docs = results.get("documents", [])
         if docs and isinstance(docs[0], list):
             docs = [d for sublist in docs for d in sublist]
+        # Field ids encode the field position, so sorting restores the original field order
+        ids = results.get("ids", [])
+        if len(ids) == len(docs):
+            docs = [d for _, d in sorted(zip(ids, docs), key=lambda pair: pair[0])]
         return docs
     except Exception as e:
         print(f"[ERROR] Failed to load collection '{collection_name}': {e}")
         return []
 
+def docs_from_fields(fields):
+    """Order {field: {"document", ...}} entries the way get_collection_docs returns them."""
+    return [fields.get(key, {}).get("document") or f"{key}: null" for key in FIELD_KEYS]
+
 def build_field_texts(field_names, docs):
     lines = []
-    for name, doc in zip(field_names, docs):
-        doc_clean = re.sub(rf"^{re.escape(name)}:\s*", "", doc, flags=re.IGNORECASE)
+    for name, key, doc in zip(field_names, FIELD_KEYS, docs):
+        # Documents are stored as "<json key>: value"; drop that label so it is not sent twice
+        doc_clean = strip_label(key, re.sub(rf"^{re.escape(name)}:\s*", "", doc, flags=re.IGNORECASE))
         lines.append(f"{name}: {doc_clean}")
     return "\n".join(lines)
 
@@ -190,7 +167,7 @@ def normalize_llm_response(data):
                     data[field][key] = ", ".join(map(str, value))
     return data
 
-def query_llm(system_prompt, user_prompt, retries=2):
+def query_llm(system_prompt, user_prompt, retries=2, label="LLM call", trimmed=0):
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt}
@@ -198,73 +175,215 @@ def query_llm(system_prompt, user_prompt, retries=2):
     for attempt in range(retries):
         try:
             response = llm_client.chat_completion(messages=messages, max_tokens=2048, temperature=0.2)
+            report_tokens(label, messages, response, budget=COMPARISON_INPUT_TOKEN_BUDGET, trimmed=trimmed)
             return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"[ERROR] LLM call failed (attempt {attempt+1}): {e}")
             time.sleep(1)
     return ""
 
-def main(resume_db_path, jd_db_path):
+def build_user_prompt(comparison_name, resume_docs, jd_docs, budget=None):
+    """
+    Fill the user template, trimming the least informative fields first so the
+    whole call stays within `budget` estimated tokens. Returns (prompt, tokens trimmed).
+    """
+    budget = budget or COMPARISON_INPUT_TOKEN_BUDGET
+    sections = [
+        (f"{prefix}{pos}", doc, TRIM_PRIORITY[pos], FIELD_MIN_TOKENS if pos < 4 else 0)
+        for prefix, docs in (("resume", resume_docs), ("jd", jd_docs))
+        for pos, doc in enumerate(docs[:5])
+    ]
+    fixed = estimate_tokens(system_prompt) + estimate_tokens(user_prompt_template) + estimate_tokens(comparison_name)
+    texts, trimmed = fit_sections(sections, budget - fixed)
+    resume_docs = [texts[f"resume{pos}"] for pos in range(len(resume_docs[:5]))]
+    jd_docs = [texts[f"jd{pos}"] for pos in range(len(jd_docs[:5]))]
+
+    user_prompt = user_prompt_template.format(
+        resume_filename=comparison_name,
+        jd_text=build_field_texts(FIELD_ORDER, jd_docs[:4]),
+        resume_text=build_field_texts(FIELD_ORDER, resume_docs[:4]),
+        jd_other_info=strip_label(FIELD_KEYS[4], jd_docs[4]) if len(jd_docs) > 4 else "",
+        resume_other_info=strip_label(FIELD_KEYS[4], resume_docs[4]) if len(resume_docs) > 4 else "",
+    )
+    return user_prompt, trimmed
+
+def compare_pair(comparison_name, resume_docs, jd_docs):
+    cache_key = comparison_cache_key(resume_docs[:5], jd_docs[:5], MODEL_NAME, PROMPT_VERSION)
+    cached = comparison_cache.get(cache_key)
+    if cached is not None:
+        print(f"[INFO] Comparison cache hit for {comparison_name}")
+        return {comparison_name: cached}
+
+    user_prompt, trimmed = build_user_prompt(comparison_name, resume_docs, jd_docs)
+
+    raw = query_llm(system_prompt, user_prompt, label=f"Comparison {comparison_name}", trimmed=trimmed)
+    if not raw:
+        return None
+
+    try:
+        cleaned = clean_llm_json(raw)
+        parsed = json.loads(cleaned)
+        parsed = {k: normalize_llm_response(v) for k, v in parsed.items()}
+
+        # Cache only the analysis itself; the key name depends on this run's file names
+        analysis = parsed.get(comparison_name)
+        if analysis is None and len(parsed) == 1:
+            analysis = next(iter(parsed.values()))
+        if isinstance(analysis, dict):
+            comparison_cache.set(cache_key, analysis)
+        return parsed
+    except json.JSONDecodeError as e:
+        print(f"[ERROR] Failed to parse JSON response for {comparison_name}: {e}")
+    except Exception as e:
+        print(f"[ERROR] Processing response for {comparison_name}: {e}")
+    return None
+
+def cascade_analysis(fast_analysis, decision, predicted):
+    analysis = dict(fast_analysis)
+    analysis["OverallMatchPercentage"] = round(predicted, 1)
+    analysis["why_overall_match_is_this"] = (
+        f"Calibrated embedding score of {predicted:.1f}% is a confident "
+        f"{'match' if decision == 'accept' else 'mismatch'}, so LLM review was skipped."
+    )
+    return analysis
+
+def compare_documents(resume_fields, jd_fields, on_result=None, max_concurrency=None, top_k=None,
+                      min_similarity=None, resume_docs=None, jd_docs=None):
+    """
+    Score every resume against every JD from in-memory {name: {field: {"document", "embedding"}}}.
+
+    `resume_docs`/`jd_docs` override the prompt documents per name; by default
+    they are built from the fields with docs_from_fields.
+    """
     try:
         start_time = time.time()
-        
-        jd_client = PersistentClient(path=jd_db_path)
-        resume_client = PersistentClient(path=resume_db_path)
+        max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
 
-        # Get all collections (each collection represents one JD or resume)
-        jd_collections = [c.name for c in jd_client.list_collections()]
-        resume_collections = [c.name for c in resume_client.list_collections()]
+        jd_collections = list(jd_fields)
+        resume_collections = list(resume_fields)
 
         if not jd_collections or not resume_collections:
-            raise ValueError("No collections found in the provided database paths")
-
-        all_results = []
-
+            raise ValueError("No resumes or job descriptions to compare")
+
+        jd_docs_by_name = jd_docs or {name: docs_from_fields(fields) for name, fields in jd_fields.items()}
+        resume_docs_by_name = resume_docs or {name: docs_from_fields(fields) for name, fields in resume_fields.items()}
+
+        # Embedding scores are recorded for every pair so later runs can be calibrated against the LLM
+        fast_scores = score_documents(resume_fields, jd_fields)
+
+        candidates = {jd_collection: resume_collections for jd_collection in jd_collections}
+        if top_k is not None or min_similarity is not None:
+            # Pre-rank on the stored field embeddings so only the strongest resumes reach the LLM
+            selected = select_candidates(
+                field_vectors(resume_fields),
+                field_vectors(jd_fields),
+                top_k=top_k,
+                min_similarity=min_similarity,
+            )
+            candidates = {jd: [name for name, _ in ranked] for jd, ranked in selected.items()}
+            kept = sum(len(names) for names in candidates.values())
+            print(f"[INFO] Similarity pre-filter kept {kept} of {len(resume_collections) * len(jd_collections)} pair(s)")
+
+        pairs = []
         for jd_collection in jd_collections:
-            jd_docs = get_collection_docs(jd_client, jd_collection)
-            if len(jd_docs) < 5:
+            if len(jd_docs_by_name[jd_collection]) < 5:
                 continue
-
-            jd_text = build_field_texts(FIELD_ORDER, jd_docs[:4])
-            jd_other_info = jd_docs[4] if len(jd_docs) > 4 else ""
-
-            for resume_collection in resume_collections:
-                resume_docs = get_collection_docs(resume_client, resume_collection)
-                if len(resume_docs) < 5:
+            for resume_collection in candidates.get(jd_collection, []):
+                if len(resume_docs_by_name[resume_collection]) < 5:
                     continue
+                pairs.append((resume_collection, jd_collection))
 
-                resume_text = build_field_texts(FIELD_ORDER, resume_docs[:4])
-                resume_other_info = resume_docs[4] if len(resume_docs) > 4 else ""
-
-                comparison_name = f"{resume_collection}_vs_{jd_collection}"
-
-                user_prompt = user_prompt_template.format(resume_filename=comparison_name)
-                user_prompt += f"\n\nJob Description Other Information:\n{jd_other_info}"
-                user_prompt += f"\nResume Other Information:\n{resume_other_info}"
-                user_prompt += f"\n\nJob Description:\n{jd_text}\n\nResume:\n{resume_text}"
-
-                raw = query_llm(system_prompt, user_prompt)
-                if not raw:
-                    continue
+        # Results are slotted by pair index so the returned order matches the sequential loop
+        ordered_results = [None] * len(pairs)
 
+        def emit(idx, parsed, details):
+            resume_collection, jd_collection = pairs[idx]
+            ordered_results[idx] = parsed
+            if on_result:
                 try:
-                    cleaned = clean_llm_json(raw)
-                    parsed = json.loads(cleaned)
-                    parsed = {k: normalize_llm_response(v) for k, v in parsed.items()}
-                    all_results.append(parsed)
-                except json.JSONDecodeError as e:
-                    print(f"[ERROR] Failed to parse JSON response for {comparison_name}: {e}")
+                    on_result(resume_collection, jd_collection, parsed, details)
+                except Exception as e:
+                    print(f"[ERROR] Result callback failed for {resume_collection}_vs_{jd_collection}: {e}")
+
+        calibration = load_calibration()
+        llm_pairs = []
+        for idx, pair in enumerate(pairs):
+            fast_analysis = fast_scores.get(pair)
+            embedding_score = fast_analysis["OverallMatchPercentage"] if fast_analysis else None
+            if calibration and embedding_score is not None:
+                decision, predicted = cascade_decision(calibration, embedding_score)
+                if decision:
+                    emit(idx, {f"{pair[0]}_vs_{pair[1]}": cascade_analysis(fast_analysis, decision, predicted)},
+                         {"decided_by": "cascade", "embedding_score": embedding_score})
                     continue
+            llm_pairs.append((idx, embedding_score))
+
+        if calibration:
+            print(f"[INFO] Cascade decided {len(pairs) - len(llm_pairs)} of {len(pairs)} pair(s) without the LLM")
+        print(f"[INFO] Comparing {len(llm_pairs)} resume/JD pair(s) with up to {max_concurrency} concurrent LLM call(s)")
+
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-compare") as executor:
+            futures = {}
+            for idx, embedding_score in llm_pairs:
+                resume_collection, jd_collection = pairs[idx]
+                future = executor.submit(
+                    compare_pair,
+                    f"{resume_collection}_vs_{jd_collection}",
+                    resume_docs_by_name[resume_collection],
+                    jd_docs_by_name[jd_collection],
+                )
+                futures[future] = (idx, embedding_score)
+
+            for future in as_completed(futures):
+                idx, embedding_score = futures[future]
+                resume_collection, jd_collection = pairs[idx]
+                try:
+                    parsed = future.result()
                 except Exception as e:
-                    print(f"[ERROR] Processing response for {comparison_name}: {e}")
+                    print(f"[ERROR] Comparison {resume_collection}_vs_{jd_collection} failed: {e}")
+                    continue
+                if parsed is None:
                     continue
 
+                emit(idx, parsed, {"decided_by": "llm", "embedding_score": embedding_score})
+
+        all_results = [r for r in ordered_results if r is not None]
+
         if not all_results:
             raise ValueError("No valid comparisons were generated")
 
+        print(f"[INFO] Comparison cache: {comparison_cache.stats()}")
         print(f"\n[INFO] Total time: {time.time() - start_time:.2f} sec")
         return all_results
 
     except Exception as e:
         print(f"[ERROR] In main comparison function: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def main(resume_db_path, jd_db_path, on_result=None, max_concurrency=None, resume_client=None, jd_client=None,
+         top_k=None, min_similarity=None):
+    try:
+        jd_client = jd_client or PersistentClient(path=jd_db_path)
+        resume_client = resume_client or PersistentClient(path=resume_db_path)
+
+        # Get all collections (each collection represents one JD or resume)
+        jd_collections = [c.name for c in jd_client.list_collections()]
+        resume_collections = [c.name for c in resume_client.list_collections()]
+
+        if not jd_collections or not resume_collections:
+            raise ValueError("No collections found in the provided database paths")
+
+        jd_docs_by_name = {name: get_collection_docs(jd_client, name) for name in jd_collections}
+        resume_docs_by_name = {name: get_collection_docs(resume_client, name) for name in resume_collections}
+        jd_fields = {name: get_collection_fields(jd_client, name) for name in jd_collections}
+        resume_fields = {name: get_collection_fields(resume_client, name) for name in resume_collections}
+
+    except Exception as e:
+        print(f"[ERROR] In main comparison function: {e}")
+        return []
+
+    return compare_documents(
+        resume_fields, jd_fields, on_result=on_result, max_concurrency=max_concurrency,
+        top_k=top_k, min_similarity=min_similarity,
+        resume_docs=resume_docs_by_name, jd_docs=jd_docs_by_name,
+    )
\ No newline at end of file
@@ -0,0 +1,79 @@
+import numpy as np
+
+# JSON field keys written by the extraction parsers; "other information" is too noisy to rank on
+SIMILARITY_FIELDS = ["skill", "education", "experience", "job role"]
+
+def get_collection_fields(client, collection_name):
+    """Return {field: {"document": text, "embedding": vector}} for one resume/JD collection."""
+    try:
+        collection = client.get_collection(collection_name)
+        results = collection.get(include=["documents", "embeddings", "metadatas"])
+    except Exception as e:
+        print(f"[ERROR] Failed to load embeddings for '{collection_name}': {e}")
+        return {}
+
+    fields = {}
+    documents = results.get("documents") or []
+    embeddings = results.get("embeddings")
+    embeddings = [] if embeddings is None else embeddings
+    for metadata, document, embedding in zip(results.get("metadatas") or [], documents, embeddings):
+        field = (metadata or {}).get("field")
+        if field and field not in fields:
+            fields[field] = {"document": document, "embedding": np.asarray(embedding, dtype=np.float32)}
+    return fields
+
+def build_field_matrix(vectors_by_name, fields=SIMILARITY_FIELDS):
+    """Stack per-document field vectors into an (N, F, D) array of unit vectors plus an (N, F) presence mask."""
+    names = list(vectors_by_name)
+    dim = next((v.shape[0] for vectors in vectors_by_name.values() for v in vectors.values()), 0)
+    matrix = np.zeros((len(names), len(fields), dim), dtype=np.float32)
+    mask = np.zeros((len(names), len(fields)), dtype=bool)
+
+    for i, name in enumerate(names):
+        for j, field in enumerate(fields):
+            vector = vectors_by_name[name].get(field)
+            if vector is None:
+                continue
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                matrix[i, j] = vector / norm
+                mask[i, j] = True
+    return names, matrix, mask
+
+def similarity_tensor(resume_matrix, resume_mask, jd_matrix, jd_mask):
+    """Cosine similarity for every resume x JD x field in one operation; missing fields are NaN."""
+    sims = np.einsum("rfd,jfd->rjf", resume_matrix, jd_matrix)
+    present = resume_mask[:, None, :] & jd_mask[None, :, :]
+    return np.where(present, sims, np.nan)
+
+def overall_similarity(sims):
+    """Mean over fields, ignoring fields missing from either document."""
+    present = ~np.isnan(sims)
+    counts = present.sum(axis=-1)
+    totals = np.where(present, sims, 0.0).sum(axis=-1)
+    return np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+
+def select_candidates(resume_vectors, jd_vectors, top_k=None, min_similarity=None):
+    """
+    Rank resumes against each JD by mean field similarity and keep the top_k
+    and/or those scoring at least min_similarity.
+
+    Returns {jd_name: [(resume_name, score), ...]} ordered best first.
+    """
+    resume_names, resume_matrix, resume_mask = build_field_matrix(resume_vectors)
+    jd_names, jd_matrix, jd_mask = build_field_matrix(jd_vectors)
+    if not resume_names or not jd_names:
+        return {}
+
+    scores = overall_similarity(similarity_tensor(resume_matrix, resume_mask, jd_matrix, jd_mask))
+
+    selected = {}
+    for j, jd_name in enumerate(jd_names):
+        order = np.argsort(-scores[:, j], kind="stable")
+        ranked = [(resume_names[i], float(scores[i, j])) for i in order]
+        if min_similarity is not None:
+            ranked = [(name, score) for name, score in ranked if score >= min_similarity]
+        if top_k is not None:
+            ranked = ranked[:top_k]
+        selected[jd_name] = ranked
+    return selected
@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import numpy as np
+from chromadb import PersistentClient
+from compare.similarity import build_field_matrix, get_collection_fields, similarity_tensor, select_candidates
+
+# Section names produced by validate_analysis, mapped to the JSON field keys they are embedded under
+SECTION_FIELDS = {
+    "Skills": "skill",
+    "Education": "education",
+    "Job Role": "job role",
+    "Experience": "experience",
+}
+SECTION_WEIGHTS = {"Skills": 0.35, "Experience": 0.35, "Education": 0.15, "Job Role": 0.15}
+
+# MiniLM cosine similarities rarely leave this band; it is stretched linearly onto 0-100%
+FAST_SIMILARITY_FLOOR = float(os.getenv("FAST_SIMILARITY_FLOOR", 0.2))
+FAST_SIMILARITY_CEILING = float(os.getenv("FAST_SIMILARITY_CEILING", 0.8))
+
+def similarity_to_pct(sims):
+    span = FAST_SIMILARITY_CEILING - FAST_SIMILARITY_FLOOR
+    pct = np.clip((sims - FAST_SIMILARITY_FLOOR) / span, 0.0, 1.0) * 100.0
+    return np.where(np.isnan(sims), 0.0, pct)
+
+def weighted_overall(pct, present):
+    weights = np.array([SECTION_WEIGHTS[section] for section in SECTION_FIELDS], dtype=np.float32)
+    weights = np.where(present, weights, 0.0)
+    totals = weights.sum(axis=-1)
+    return np.divide((pct * weights).sum(axis=-1), totals, out=np.zeros_like(totals), where=totals > 0)
+
+def strip_label(field, document):
+    if not document:
+        return ""
+    return re.sub(rf"^{re.escape(field)}:\s*", "", document, flags=re.IGNORECASE)
+
+def build_analysis(resume_fields, jd_fields, sims, pct, overall):
+    analysis = {}
+    for k, (section, field) in enumerate(SECTION_FIELDS.items()):
+        similarity = sims[k]
+        analysis[section] = {
+            "match_pct": round(float(pct[k]), 1),
+            "resume_value": strip_label(field, resume_fields.get(field, {}).get("document")),
+            "job_description_value": strip_label(field, jd_fields.get(field, {}).get("document")),
+            "explanation": (
+                f"Embedding similarity {similarity:.2f} (fast mode, no LLM review)."
+                if not np.isnan(similarity) else "Field missing from the resume or job description."
+            ),
+        }
+    analysis["OverallMatchPercentage"] = round(float(overall), 1)
+    analysis["why_overall_match_is_this"] = (
+        "Weighted average of per-section embedding similarity "
+        + ", ".join(f"{section} {int(weight * 100)}%" for section, weight in SECTION_WEIGHTS.items())
+        + "."
+    )
+    analysis["AI_Generated_Estimate_Percentage"] = 0
+    return analysis
+
+def field_vectors(fields_by_name):
+    return {name: {field: entry["embedding"] for field, entry in entries.items()} for name, entries in fields_by_name.items()}
+
+def score_documents(resume_fields_by_name, jd_fields_by_name):
+    """
+    Score every resume against every JD from embeddings alone.
+
+    Inputs map a collection name to {field: {"document", "embedding"}}. Returns
+    {(resume_name, jd_name): analysis} where analysis matches validate_analysis.
+    """
+    fields = list(SECTION_FIELDS.values())
+    resume_names, resume_matrix, resume_mask = build_field_matrix(field_vectors(resume_fields_by_name), fields=fields)
+    jd_names, jd_matrix, jd_mask = build_field_matrix(field_vectors(jd_fields_by_name), fields=fields)
+    if not resume_names or not jd_names:
+        return {}
+
+    # (resumes, JDs, sections) in one pass
+    sims = similarity_tensor(resume_matrix, resume_mask, jd_matrix, jd_mask)
+    pct = similarity_to_pct(sims)
+    overall = weighted_overall(pct, ~np.isnan(sims))
+
+    scored = {}
+    for i, resume_name in enumerate(resume_names):
+        for j, jd_name in enumerate(jd_names):
+            scored[(resume_name, jd_name)] = build_analysis(
+                resume_fields_by_name[resume_name], jd_fields_by_name[jd_name],
+                sims[i, j], pct[i, j], overall[i, j],
+            )
+    return scored
+
+def score_pairs(resume_fields, jd_fields, on_result=None, top_k=None, min_similarity=None):
+    """Fast-mode scoring of in-memory {name: {field: {"document", "embedding"}}} documents."""
+    try:
+        start_time = time.time()
+
+        if not resume_fields or not jd_fields:
+            raise ValueError("No resumes or job descriptions to score")
+
+        scored = score_documents(resume_fields, jd_fields)
+
+        if top_k is not None or min_similarity is not None:
+            selected = select_candidates(
+                field_vectors(resume_fields),
+                field_vectors(jd_fields),
+                top_k=top_k,
+                min_similarity=min_similarity,
+            )
+            keep = {(resume, jd) for jd, ranked in selected.items() for resume, _ in ranked}
+            scored = {pair: analysis for pair, analysis in scored.items() if pair in keep}
+
+        all_results = []
+        for (resume_name, jd_name), analysis in scored.items():
+            parsed = {f"{resume_name}_vs_{jd_name}": analysis}
+            all_results.append(parsed)
+            if on_result:
+                try:
+                    on_result(resume_name, jd_name, parsed, {
+                        "decided_by": "fast",
+                        "embedding_score": analysis["OverallMatchPercentage"],
+                    })
+                except Exception as e:
+                    print(f"[ERROR] Result callback failed for {resume_name}_vs_{jd_name}: {e}")
+
+        if not all_results:
+            raise ValueError("No valid comparisons were generated")
+
+        print(f"\n[INFO] Scored {len(all_results)} pair(s) from embeddings in {time.time() - start_time:.3f} sec")
+        return all_results
+
+    except Exception as e:
+        print(f"[ERROR] In vector scoring: {e}")
+        return []
+
+def main(resume_db_path, jd_db_path, on_result=None, resume_client=None, jd_client=None,
+         top_k=None, min_similarity=None):
+    try:
+        jd_client = jd_client or PersistentClient(path=jd_db_path)
+        resume_client = resume_client or PersistentClient(path=resume_db_path)
+
+        resume_fields = {c.name: get_collection_fields(resume_client, c.name) for c in resume_client.list_collections()}
+        jd_fields = {c.name: get_collection_fields(jd_client, c.name) for c in jd_client.list_collections()}
+
+        if not resume_fields or not jd_fields:
+            raise ValueError("No collections found in the provided database paths")
+
+    except Exception as e:
+        print(f"[ERROR] In vector scoring: {e}")
+        return []
+
+    return score_pairs(resume_fields, jd_fields, on_result=on_result, top_k=top_k, min_similarity=min_similarity)
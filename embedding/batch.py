@@ -0,0 +1,105 @@
+import os
+import numpy as np
+from embedding.cache import embedding_cache
+from embedding.model import EMBEDDING_MODEL_NAME, get_embedder
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 256))
+
+def build_field_entries(record):
+    """Turn one parsed resume/JD dict into labeled field texts and their metadata."""
+    texts = []
+    metadatas = []
+
+    for field in record:
+        content = record.get(field)
+
+        if content is None or (isinstance(content, str) and content.strip() == ""):
+            content_str = "null"
+        elif isinstance(content, dict):
+            content_str = "; ".join([f"{k}: {v}" for k, v in content.items()])
+        elif isinstance(content, list):
+            content_str = "; ".join(map(str, content))
+        else:
+            content_str = str(content).strip()
+
+        labeled_text = f"{field}: {content_str}"
+
+        print(f" Field: {field}")
+        print(f" Content: {content_str[:150]}...\n")
+
+        texts.append(labeled_text)
+        metadatas.append({"field": field})
+
+    return texts, metadatas
+
+def encode_texts(texts, batch_size=None, model_name=EMBEDDING_MODEL_NAME):
+    """Encode texts, reusing cached vectors and sending only the misses to the model."""
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    keys = [embedding_cache.key_for(model_name, text) for text in texts]
+    vectors = embedding_cache.get_many(keys)
+    cached_count = sum(1 for key in keys if key in vectors)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors:
+            missing.setdefault(key, text)
+
+    if missing:
+        encoded = get_embedder(model_name).encode(
+            list(missing.values()), batch_size=batch_size, convert_to_numpy=True
+        ).astype(np.float32)
+        new_items = list(zip(missing.keys(), encoded))
+        embedding_cache.put_many(new_items)
+        vectors.update(new_items)
+
+    print(f"[INFO] Embedding cache: {cached_count} of {len(texts)} field text(s) cached, {len(missing)} encoded")
+    return np.stack([vectors[key] for key in keys])
+
+def embed_documents(documents, batch_size=None):
+    """
+    Encode the field texts of many documents in one batched pass.
+
+    `documents` maps a collection name to its parsed JSON (a dict or a list of dicts).
+    Returns {collection_name: [{"texts", "metadatas", "embeddings"}, ...]} with one
+    entry per record, so callers can store each document's vectors separately.
+    """
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    embedded = {}
+    all_texts = []
+
+    for name, data in documents.items():
+        records = [data] if isinstance(data, dict) else list(data or [])
+        embedded[name] = []
+        for record in records:
+            texts, metadatas = build_field_entries(record)
+            embedded[name].append({"texts": texts, "metadatas": metadatas, "offset": len(all_texts)})
+            all_texts.extend(texts)
+
+    vectors = encode_texts(all_texts, batch_size) if all_texts else []
+    print(f"[INFO] Encoded {len(all_texts)} field text(s) from {len(documents)} document(s) in batches of {batch_size}")
+
+    # Scatter the flat batch back to the documents it came from
+    for entries in embedded.values():
+        for entry in entries:
+            offset = entry.pop("offset")
+            entry["embeddings"] = vectors[offset:offset + len(entry["texts"])]
+
+    return embedded
+
+def embed_fields(documents, batch_size=None):
+    """
+    Embed parsed documents for in-process use, without a vector store.
+
+    Returns {name: {field: {"document", "embedding"}}} for the first record of each
+    document, the same shape compare.similarity.get_collection_fields reads from Chroma.
+    """
+    fields_by_name = {}
+    for name, entries in embed_documents(documents, batch_size).items():
+        if not entries:
+            continue
+        entry = entries[0]
+        fields_by_name[name] = {
+            meta["field"]: {"document": text, "embedding": embedding}
+            for meta, text, embedding in zip(entry["metadatas"], entry["texts"], entry["embeddings"])
+        }
+    return fields_by_name
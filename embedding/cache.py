@@ -0,0 +1,125 @@
+import os
+import time
+import sqlite3
+import threading
+import numpy as np
+from utils.cache import CACHE_DIR, CACHE_RECOUNT_EVERY, hash_key
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CACHE_DIR, "embeddings.sqlite"))
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", 512))
+
+# SQLite caps the number of bound parameters per statement
+LOOKUP_CHUNK = 500
+
+class EmbeddingCache:
+    """On-disk map of (model, labeled text) hash to a float32 vector, probed in bulk per batch."""
+
+    def __init__(self, path, max_bytes):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                "key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_accessed ON vectors (accessed_at)")
+        self._total_bytes = self._count_bytes()
+
+    @staticmethod
+    def key_for(model_name, text):
+        return hash_key(model_name, text)
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, dim, vector FROM vectors WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, dim, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany("UPDATE vectors SET accessed_at = ? WHERE key = ?", [(now, k) for k in found])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((key, int(vector.shape[0]), vector.tobytes(), now))
+        if not rows:
+            return
+        with self._lock:
+            replaced = self._stored_sizes([row[0] for row in rows])
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO vectors (key, dim, vector, accessed_at) VALUES (?, ?, ?, ?)", rows
+                )
+            new_sizes = {row[0]: len(row[2]) for row in rows}
+            self._total_bytes += sum(new_sizes.values()) - sum(replaced.values())
+            self._evict()
+
+    def _stored_sizes(self, keys):
+        sizes = {}
+        keys = list(dict.fromkeys(keys))
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            sizes.update(self._conn.execute(
+                f"SELECT key, LENGTH(vector) FROM vectors WHERE key IN ({placeholders})", chunk
+            ).fetchall())
+        return sizes
+
+    def _count_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM vectors").fetchone()[0]
+
+    def _evict(self):
+        # A running total avoids scanning the table on every write; it is recounted now and then
+        self._writes += 1
+        if self._writes >= CACHE_RECOUNT_EVERY:
+            self._total_bytes = self._count_bytes()
+            self._writes = 0
+        if self._total_bytes <= self.max_bytes:
+            return
+        excess = self._total_bytes - self.max_bytes
+        removed = 0
+        keys = []
+        for key, size in self._conn.execute("SELECT key, LENGTH(vector) FROM vectors ORDER BY accessed_at ASC"):
+            keys.append(key)
+            removed += size
+            if removed >= excess:
+                break
+        with self._conn:
+            self._conn.executemany("DELETE FROM vectors WHERE key = ?", [(k,) for k in keys])
+        self._total_bytes -= removed
+        print(f"[INFO] Evicted {len(keys)} cached embedding(s) from {self.path}")
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+            }
+
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_bytes=int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024))
@@ -1,9 +1,7 @@
 import os
 import json
-import uuid
-import shutil
 import re
-from sentence_transformers import SentenceTransformer
+from embedding.batch import embed_documents
 from chromadb import PersistentClient
 
 def load_json_from_file(json_path):
@@ -33,81 +31,51 @@ def sanitize_collection_name(name):
         name = (name + "___")[:3]
     return name
 
-def delete_collection_folder(collection_name, persist_dir):
-    """Delete Chroma persisted collection data from disk."""
-    collection_path = os.path.join(persist_dir, "collections", collection_name)
-    if os.path.exists(collection_path):
-        try:
-            shutil.rmtree(collection_path)
-            print(f"[INFO] Deleted collection folder: {collection_path}")
-        except Exception as e:
-            print(f"[ERROR] Could not delete collection folder '{collection_path}': {e}")
-
-def delete_chromadb_collection(client, collection_name):
-    """Delete ChromaDB collection if it exists."""
-    try:
-        client.delete_collection(name=collection_name)
-        print(f"[INFO] Deleted existing ChromaDB collection: {collection_name}")
-    except Exception as e:
-        print(f"[DEBUG] Collection '{collection_name}' did not exist or could not be deleted: {e}")
+def field_ids(collection_name, record_idx, count):
+    """Stable per-field ids so re-embedding a document upserts in place and keeps field order."""
+    return [f"{collection_name}-{record_idx:04d}-{pos:03d}" for pos in range(count)]
 
-def embed_and_store_fields(data, collection_name, persist_dir):
-    delete_collection_folder(collection_name, persist_dir)
-    client = init_chromadb(persist_dir)
+def embed_and_store_fields(data, collection_name, persist_dir, embedded=None, client=None):
+    client = client or init_chromadb(persist_dir)
     if not client:
         print("[ERROR] ChromaDB client initialization failed.")
         return False
 
-    delete_chromadb_collection(client, collection_name)
     collection = client.get_or_create_collection(name=collection_name)
-    embedder = SentenceTransformer("all-MiniLM-L6-v2")
 
-    if isinstance(data, dict):
-        data = [data]
+    if embedded is None:
+        embedded = embed_documents({collection_name: data})[collection_name]
 
     total_chunks = 0
+    stored_ids = set()
 
-    for idx, jd in enumerate(data):
-        texts = []
-        metadatas = []
-        ids = []
-
-        print(f"\n[INFO] Embedding fields for JD #{idx+1} -> Collection: {collection_name}")
-
-        for field in jd:
-            content = jd.get(field)
-
-            if content is None or (isinstance(content, str) and content.strip() == ""):
-                content_str = "null"
-            elif isinstance(content, dict):
-                content_str = "; ".join([f"{k}: {v}" for k, v in content.items()])
-            elif isinstance(content, list):
-                content_str = "; ".join(map(str, content))
-            else:
-                content_str = str(content).strip()
-
-            labeled_text = f"{field}: {content_str}"
-
-            print(f" Field: {field}")
-            print(f" Content: {content_str[:150]}...\n")
+    for idx, entry in enumerate(embedded):
+        texts = entry["texts"]
 
-            texts.append(labeled_text)
-            metadatas.append({"field": field})
-            ids.append(str(uuid.uuid4()))
+        print(f"\n[INFO] Storing embedded fields for JD #{idx+1} -> Collection: {collection_name}")
 
         if not texts:
             print(f"[WARNING] No valid fields to embed for JD #{idx+1}")
             continue
 
-        embeddings = embedder.encode(texts)
-        collection.add(
+        ids = field_ids(collection_name, idx, len(texts))
+        collection.upsert(
             ids=ids,
             documents=texts,
-            embeddings=embeddings.tolist(),
-            metadatas=metadatas
+            embeddings=entry["embeddings"].tolist(),
+            metadatas=entry["metadatas"]
         )
+        stored_ids.update(ids)
         total_chunks += len(texts)
 
+    # Drop fields left over from a previous version of this document
+    try:
+        stale_ids = set(collection.get(include=[])["ids"]) - stored_ids
+        if stale_ids:
+            collection.delete(ids=list(stale_ids))
+    except Exception as e:
+        print(f"[WARNING] Could not prune stale fields from '{collection_name}': {e}")
+
     print(f"[INFO] Stored {total_chunks} total embedded field(s) in collection '{collection_name}'")
 
     try:
@@ -118,8 +86,8 @@ def embed_and_store_fields(data, collection_name, persist_dir):
         print(f"[ERROR] Verification failed for collection '{collection_name}': {e}")
         return False
 
-def remove_orphan_collections(folder_path, persist_dir):
-    client = init_chromadb(persist_dir)
+def remove_orphan_collections(folder_path, persist_dir, client=None):
+    client = client or init_chromadb(persist_dir)
     if not client:
         return
     existing_collections = set(c.name for c in client.list_collections())
@@ -129,32 +97,45 @@ def remove_orphan_collections(folder_path, persist_dir):
     for orphan in orphan_collections:
         try:
             client.delete_collection(name=orphan)
-            delete_collection_folder(orphan, persist_dir)
             print(f"[INFO] Removed orphan collection: {orphan}")
         except Exception as e:
             print(f"[ERROR] Could not remove orphan collection '{orphan}': {e}")
 
-def embed_all_jsons_from_folder(folder_path, persist_dir):
+def embed_all_jsons_from_folder(folder_path, persist_dir, client=None):
     os.makedirs(persist_dir, exist_ok=True)
+    client = client or init_chromadb(persist_dir)
+    if not client:
+        print("[ERROR] ChromaDB client initialization failed.")
+        return
 
     files = [f for f in os.listdir(folder_path) if f.lower().endswith('.json')]
     print(f"\n[INFO] Found {len(files)} JSON files in folder '{folder_path}'.")
 
-    remove_orphan_collections(folder_path, persist_dir)
+    remove_orphan_collections(folder_path, persist_dir, client=client)
 
     if not files:
         print("[WARNING] No JSON files found to embed.")
         return
 
+    documents = {}
     for file in files:
         json_path = os.path.join(folder_path, file)
-        collection_name = sanitize_collection_name(file)
+        documents[sanitize_collection_name(file)] = (file, load_json_from_file(json_path))
+
+    # One batched encode across every document instead of one small encode per file
+    embedded = embed_documents({name: data for name, (_, data) in documents.items()})
 
+    for collection_name, (file, json_data) in documents.items():
         print(f"\n[INFO] Processing file: {file} -> Collection: '{collection_name}'")
 
         try:
-            json_data = load_json_from_file(json_path)
-            success = embed_and_store_fields(json_data, collection_name=collection_name, persist_dir=persist_dir)
+            success = embed_and_store_fields(
+                json_data,
+                collection_name=collection_name,
+                persist_dir=persist_dir,
+                embedded=embedded.get(collection_name),
+                client=client,
+            )
             if success:
                 print(f"[SUCCESS] Embedding completed and verified for: {file}")
             else:
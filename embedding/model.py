@@ -0,0 +1,20 @@
+import os
+import threading
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+_models = {}
+_lock = threading.Lock()
+
+def get_embedder(model_name=EMBEDDING_MODEL_NAME):
+    """Return the process-wide SentenceTransformer, loading it on first use."""
+    model = _models.get(model_name)
+    if model is None:
+        with _lock:
+            model = _models.get(model_name)
+            if model is None:
+                print(f"[INFO] Loading embedding model '{model_name}'")
+                model = SentenceTransformer(model_name)
+                _models[model_name] = model
+    return model
@@ -0,0 +1,169 @@
+import os
+import time
+import threading
+import numpy as np
+from chromadb import PersistentClient
+from utils.cache import hash_key
+
+TALENT_POOL_PATH = os.getenv("TALENT_POOL_PATH", "talent_pool")
+CANDIDATE_COLLECTION = "candidates"
+JD_COLLECTION = "job_descriptions"
+
+# Fields worth matching on; "other information" is indexed but not searched
+SEARCH_FIELDS = ["skill", "education", "experience", "job role"]
+
+# HNSW graph parameters. M and construction_ef are fixed when a collection is
+# created; search_ef trades query latency for recall and is re-applied to an
+# existing collection whenever it changes (see apply_search_ef).
+HNSW_M = int(os.getenv("HNSW_M", 32))
+HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", 200))
+HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", 128))
+
+_client = None
+_lock = threading.Lock()
+
+def get_pool_client():
+    """Long-lived client for the talent pool, shared by every request in the process."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                os.makedirs(TALENT_POOL_PATH, exist_ok=True)
+                _client = PersistentClient(path=TALENT_POOL_PATH)
+    return _client
+
+def hnsw_metadata(m=None, construction_ef=None, search_ef=None):
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:M": m or HNSW_M,
+        "hnsw:construction_ef": construction_ef or HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": search_ef or HNSW_SEARCH_EF,
+    }
+
+def apply_search_ef(collection, search_ef=None):
+    """
+    get_or_create_collection ignores the metadata of a collection that already
+    exists, so a changed HNSW_SEARCH_EF is pushed through the configuration API.
+    """
+    search_ef = search_ef or HNSW_SEARCH_EF
+    configuration = getattr(collection, "configuration", None)
+    if not configuration:
+        # Chroma releases before the configuration API only take search_ef at creation
+        current = (collection.metadata or {}).get("hnsw:search_ef")
+        if current is not None and current != search_ef:
+            print(f"[WARNING] Talent pool collection '{collection.name}' keeps search_ef={current}; "
+                  f"rebuild it to apply {search_ef}")
+        return
+    current = (configuration.get("hnsw") or {}).get("ef_search")
+    if current is not None and current != search_ef:
+        collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        print(f"[INFO] Changed search_ef on talent pool collection '{collection.name}' from {current} to {search_ef}")
+
+def get_pool_collection(name, client=None):
+    client = client or get_pool_client()
+    collection = client.get_or_create_collection(name=name, metadata=hnsw_metadata())
+    apply_search_ef(collection)
+    return collection
+
+def document_id(fields):
+    """Content-derived id, so re-uploading the same document lands on the same index entry."""
+    return hash_key(*(f"{field}={fields[field]['document']}" for field in sorted(fields)))[:16]
+
+def add_documents(collection_name, fields_by_name):
+    """
+    Upsert run documents into the pool.
+
+    `fields_by_name` maps a run-local name (the Chroma collection name) to
+    {field: {"document", "embedding"}}. Returns {name: document_id}.
+    """
+    collection = get_pool_collection(collection_name)
+    ids, documents, embeddings, metadatas = [], [], [], []
+    assigned = {}
+    now = time.time()
+
+    for name, fields in fields_by_name.items():
+        if not fields:
+            continue
+        doc_id = document_id(fields)
+        assigned[name] = doc_id
+        for field, entry in fields.items():
+            ids.append(f"{doc_id}::{field}")
+            documents.append(entry["document"])
+            embeddings.append([float(x) for x in entry["embedding"]])
+            metadatas.append({"doc_id": doc_id, "field": field, "name": name, "indexed_at": now})
+
+    if ids:
+        collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+    print(f"[INFO] Indexed {len(assigned)} document(s) into talent pool collection '{collection_name}'")
+    return assigned
+
+def add_run_to_pool(resume_fields, jd_fields):
+    return {
+        "candidates": add_documents(CANDIDATE_COLLECTION, resume_fields),
+        "job_descriptions": add_documents(JD_COLLECTION, jd_fields),
+    }
+
+def get_document_fields(collection_name, doc_id):
+    """Return (name, {field: {"document", "embedding"}}) for one indexed document, or (None, {}) if unknown."""
+    results = get_pool_collection(collection_name).get(
+        where={"doc_id": doc_id}, include=["documents", "embeddings", "metadatas"]
+    )
+    metadatas = results.get("metadatas") or []
+    documents = results.get("documents") or []
+    embeddings = results.get("embeddings")
+    embeddings = [] if embeddings is None else embeddings
+    fields = {
+        meta["field"]: {"document": document, "embedding": np.asarray(embedding, dtype=np.float32)}
+        for meta, document, embedding in zip(metadatas, documents, embeddings)
+    }
+    name = metadatas[0].get("name") if metadatas else None
+    return name, fields
+
+def get_document_vectors(collection_name, doc_id):
+    """Return (name, {field: embedding}) for one indexed document, or (None, {}) if unknown."""
+    name, fields = get_document_fields(collection_name, doc_id)
+    return name, {field: entry["embedding"] for field, entry in fields.items()}
+
+def search(collection_name, query_vectors, top_k=10, fields=SEARCH_FIELDS, client=None):
+    """
+    Rank indexed documents by mean per-field cosine similarity to `query_vectors`
+    ({field: embedding}). Each field is one HNSW query filtered on the `field` metadata,
+    so pass `fields` to restrict matching to e.g. ["skill", "experience"].
+    """
+    collection = get_pool_collection(collection_name, client=client)
+    total = collection.count()
+    if total == 0:
+        return []
+
+    query_fields = [field for field in fields if field in query_vectors]
+    if not query_fields:
+        return []
+
+    # Over-fetch per field so documents that are strong on most fields still surface
+    n_results = min(max(top_k * 5, 50), total)
+    field_scores = {}
+    names = {}
+
+    for field in query_fields:
+        results = collection.query(
+            # Chroma rejects numpy float32 elements, so convert like add_documents does
+            query_embeddings=[[float(x) for x in query_vectors[field]]],
+            n_results=n_results,
+            where={"field": field},
+            include=["metadatas", "distances"],
+        )
+        for meta, distance in zip(results["metadatas"][0], results["distances"][0]):
+            doc_id = meta["doc_id"]
+            names[doc_id] = meta.get("name")
+            field_scores.setdefault(doc_id, {})[field] = round(1.0 - float(distance), 4)
+
+    ranked = []
+    for doc_id, scores in field_scores.items():
+        ranked.append({
+            "id": doc_id,
+            "name": names.get(doc_id),
+            "score": round(sum(scores.values()) / len(query_fields), 4),
+            "field_scores": scores,
+        })
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked[:top_k]
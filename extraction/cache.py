@@ -0,0 +1,10 @@
+import os
+from utils.cache import CACHE_DIR, SQLiteCache, hash_key, prompt_version
+
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", os.path.join(CACHE_DIR, "extraction.sqlite"))
+EXTRACTION_CACHE_MAX_MB = float(os.getenv("EXTRACTION_CACHE_MAX_MB", 256))
+
+extraction_cache = SQLiteCache(EXTRACTION_CACHE_PATH, max_bytes=int(EXTRACTION_CACHE_MAX_MB * 1024 * 1024))
+
+def extraction_cache_key(text, model_name, system_prompt):
+    return hash_key(text, model_name, prompt_version(system_prompt))
@@ -1,19 +1,25 @@
 import os
 import json
 import re
-import fitz  # PyMuPDF
-from docx import Document
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from huggingface_hub import InferenceClient
+from extraction.cache import extraction_cache, extraction_cache_key
+from extraction.text_extraction import extract_text_from_file, extract_texts
+from utils.prompts import compact_prompt, estimate_tokens, report_tokens, trim_text
 from dotenv import load_dotenv
 load_dotenv()
  
+EXTRACTION_MAX_WORKERS = int(os.getenv("EXTRACTION_MAX_WORKERS", 4))
+# Estimated input tokens per parsing call; over-long documents lose their tail
+EXTRACTION_INPUT_TOKEN_BUDGET = int(os.getenv("EXTRACTION_INPUT_TOKEN_BUDGET", 6000))
+ 
  
 class LLMJDParser:
     def __init__(self, model_name=os.getenv("MODEL_NAME")):
         self.model = model_name
 
         self.client = InferenceClient(model=self.model, token=os.getenv("TOKEN"))
-        self.system_prompt = self._build_system_prompt()
+        self.system_prompt = compact_prompt(self._build_system_prompt())
  
     def _build_system_prompt(self):
         return '''
@@ -88,9 +94,6 @@ Flexible working hours and wellness benefits
 Output Format
 Return exactly this JSON object:
 
-json
-Copy
-Edit
 {
   "skill": [],
   "education": [],
@@ -127,6 +130,15 @@ job role must contain only one job title — no composite or repeated roles.
  
     def extract_fields(self, jd_text: str) -> dict:
         cleaned_text = self.clean_text(jd_text)
+        text_budget = EXTRACTION_INPUT_TOKEN_BUDGET - estimate_tokens(self.system_prompt)
+        trimmed = estimate_tokens(cleaned_text)
+        cleaned_text = trim_text(cleaned_text, text_budget)
+        trimmed -= estimate_tokens(cleaned_text)
+        cache_key = extraction_cache_key(cleaned_text, self.model, self.system_prompt)
+        cached = extraction_cache.get(cache_key)
+        if cached is not None:
+            print(" Extraction cache hit, skipping LLM call")
+            return cached
  
         try:
             messages = [
@@ -138,6 +150,7 @@ job role must contain only one job title — no composite or repeated roles.
                 messages=messages,
                 max_tokens=1024
             )
+            report_tokens("JD extraction", messages, response, budget=EXTRACTION_INPUT_TOKEN_BUDGET, trimmed=trimmed)
  
             raw_output = response.choices[0].message.content.strip()
  
@@ -162,6 +175,7 @@ job role must contain only one job title — no composite or repeated roles.
                 if key not in result or not isinstance(result[key], list):
                     result[key] = []
  
+            extraction_cache.set(cache_key, result)
             return result
  
         except Exception as e:
@@ -185,40 +199,7 @@ job role must contain only one job title — no composite or repeated roles.
             print(f" Failed to save {output_path}: {e}")
  
     def extract_text_from_file(self, file_path: str) -> str:
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext == ".pdf":
-            try:
-                doc = fitz.open(file_path)
-                texts = []
-                for page in doc:
-                    text = page.get_text()
-                    if not text.strip():
-                        blocks = page.get_text("blocks")
-                        text = "\n".join(
-                            b[4].strip() for b in sorted(blocks, key=lambda b: (b[1], b[0])) if b[4].strip()
-                        )
-                    texts.append(text.strip())
-                return " ".join(texts)
-            except Exception as e:
-                print(f" Error reading PDF {file_path}: {e}")
-                return ""
-        elif ext == ".docx":
-            try:
-                doc = Document(file_path)
-                return " ".join(para.text.strip() for para in doc.paragraphs if para.text.strip())
-            except Exception as e:
-                print(f" Error reading DOCX {file_path}: {e}")
-                return ""
-        elif ext == ".txt":
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    return f.read()
-            except Exception as e:
-                print(f" Error reading TXT {file_path}: {e}")
-                return ""
-        else:
-            print(f"Unsupported file format: {file_path}")
-            return ""
+        return extract_text_from_file(file_path, extensions=(".pdf", ".docx", ".txt"))
  
  
 # Clear old JSON files
@@ -236,12 +217,24 @@ def clear_json_folder(folder_path):
         os.makedirs(folder_path)
  
  
+def extract_and_save(parser, file_path: str, output_dir: str, text: str):
+    print(f"\n Processing JD: {file_path}")
+    if not text.strip():
+        print(f" Skipped empty or unreadable JD file: {file_path}")
+        raise ValueError("empty or unreadable file")
+    parsed = parser.extract_fields(text)
+    if not parsed:
+        raise ValueError("no valid JSON returned by the LLM")
+    if output_dir:
+        parser.save_to_json(parsed, output_dir, file_path)
+    return parsed
+ 
+ 
 #  Main JD parsing logic
-def process_jds(input_path: str, output_dir: str):
+def extract_jds(input_path: str, output_dir: str = None, max_workers: int = None):
+    """Parse every JD under input_path; returns ({file_path: fields}, {file_path: error})."""
     parser = LLMJDParser()
  
-    clear_json_folder(output_dir)
- 
     if os.path.isfile(input_path):
         files = [input_path] if input_path.lower().endswith((".pdf", ".docx", ".txt")) else []
     elif os.path.isdir(input_path):
@@ -249,13 +242,32 @@ def process_jds(input_path: str, output_dir: str):
                  if f.lower().endswith((".pdf", ".docx", ".txt"))]
     else:
         print(f" Invalid path: {input_path}")
-        return
- 
-    for file_path in files:
-        print(f"\n Processing JD: {file_path}")
-        text = parser.extract_text_from_file(file_path)
-        if not text.strip():
-            print(f" Skipped empty or unreadable JD file: {file_path}")
-            continue
-        parsed = parser.extract_fields(text)
-        parser.save_to_json(parsed, output_dir, file_path)
\ No newline at end of file
+        return {}, {}
+ 
+    max_workers = max_workers or EXTRACTION_MAX_WORKERS
+    documents = {}
+    failures = {}
+ 
+    # PDF/DOCX parsing is CPU bound and runs in a process pool before the LLM stage
+    texts = extract_texts(files, extensions=(".pdf", ".docx", ".txt"))
+ 
+    # LLM calls are I/O bound, so a thread pool overlaps the round trips for many documents
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jd-extract") as executor:
+        futures = {executor.submit(extract_and_save, parser, file_path, output_dir, texts.get(file_path, "")): file_path for file_path in files}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                documents[file_path] = future.result()
+            except Exception as e:
+                print(f" Failed to extract {file_path}: {e}")
+                failures[file_path] = str(e)
+ 
+    print(f" Extraction cache: {extraction_cache.stats()}")
+    if failures:
+        print(f" {len(failures)} of {len(files)} file(s) failed extraction")
+    return documents, failures
+ 
+ 
+def process_jds(input_path: str, output_dir: str, max_workers: int = None):
+    clear_json_folder(output_dir)
+    return extract_jds(input_path, output_dir, max_workers)[1]
\ No newline at end of file
@@ -0,0 +1,127 @@
+import os
+import time
+import queue
+import itertools
+import multiprocessing
+from collections import deque
+import fitz  # PyMuPDF
+from docx import Document
+
+TEXT_EXTRACTION_WORKERS = int(os.getenv("TEXT_EXTRACTION_WORKERS", os.cpu_count() or 1))
+TEXT_EXTRACTION_TIMEOUT = float(os.getenv("TEXT_EXTRACTION_TIMEOUT", 60))
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+
+def extract_text_from_file(file_path: str, extensions=SUPPORTED_EXTENSIONS) -> str:
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in extensions:
+        print(f"Unsupported file format: {file_path}")
+        return ""
+    if ext == ".pdf":
+        try:
+            doc = fitz.open(file_path)
+            texts = []
+            for page in doc:
+                text = page.get_text()
+                if not text.strip():
+                    blocks = page.get_text("blocks")
+                    text = "\n".join(
+                        b[4].strip() for b in sorted(blocks, key=lambda b: (b[1], b[0])) if b[4].strip()
+                    )
+                texts.append(text.strip())
+            return " ".join(texts)
+        except Exception as e:
+            print(f" Error reading PDF {file_path}: {e}")
+            return ""
+    elif ext == ".docx":
+        try:
+            doc = Document(file_path)
+            return " ".join(para.text.strip() for para in doc.paragraphs if para.text.strip())
+        except Exception as e:
+            print(f" Error reading DOCX {file_path}: {e}")
+            return ""
+    else:
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except Exception as e:
+            print(f" Error reading TXT {file_path}: {e}")
+            return ""
+
+
+def _pool_context():
+    # Forking a process that already runs API and job threads can copy held locks,
+    # so workers are started from a clean interpreter instead.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def extract_texts(file_paths, extensions=SUPPORTED_EXTENSIONS, max_workers=None, timeout=None) -> dict:
+    """
+    Extract text from many files across a process pool; returns {file_path: text}.
+
+    At most one file per worker is in flight, so each file's `timeout` counts from
+    when it started. A file that overruns gets empty text and the pool is replaced,
+    with the files that were still running resubmitted.
+    """
+    file_paths = list(file_paths)
+    if not file_paths:
+        return {}
+
+    max_workers = min(max_workers or TEXT_EXTRACTION_WORKERS, len(file_paths))
+    timeout = timeout or TEXT_EXTRACTION_TIMEOUT
+
+    texts = {}
+    waiting = deque(file_paths)
+    running = {}  # task id -> (path, started)
+    finished = queue.Queue()
+    task_ids = itertools.count()
+    pool = _pool_context().Pool(processes=max_workers)
+    try:
+        while waiting or running:
+            while waiting and len(running) < max_workers:
+                path = waiting.popleft()
+                task = next(task_ids)
+                running[task] = (path, time.monotonic())
+                pool.apply_async(
+                    extract_text_from_file, (path, extensions),
+                    callback=lambda text, task=task: finished.put((task, text, None)),
+                    error_callback=lambda e, task=task: finished.put((task, "", e)),
+                )
+
+            deadline = min(started for _, started in running.values()) + timeout
+            try:
+                task, text, error = finished.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                task = None
+            # Results from a pool that was already replaced are ignored
+            if task in running:
+                path, _ = running.pop(task)
+                if error is not None:
+                    print(f" Text extraction failed for {path}: {error}")
+                texts[path] = text
+
+            now = time.monotonic()
+            expired = [task for task, (_, started) in running.items() if now - started >= timeout]
+            if not expired:
+                continue
+            for task in expired:
+                path, _ = running.pop(task)
+                print(f" Text extraction timed out after {timeout:.0f}s: {path}")
+                texts[path] = ""
+            # A worker stuck on a pathological document never returns, so it has to be killed;
+            # Pool can only kill all of them, so the other in-flight files start over on a fresh pool
+            pool.terminate()
+            pool.join()
+            waiting.extendleft(reversed([path for path, _ in running.values()]))
+            running.clear()
+            pool = _pool_context().Pool(processes=max_workers)
+    finally:
+        if running:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+
+    return {path: texts.get(path, "") for path in file_paths}
@@ -1,16 +1,28 @@
 import uvicorn
-from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import tempfile, os
-from typing import List
+from starlette.concurrency import run_in_threadpool
+import tempfile, os, time, json, asyncio
+from typing import List, Literal, Optional
 
-from api import main as run_pipeline
-from utils.db import save_result, get_all_results, db
-from utils.validation import validate_analysis
+from api import main as run_pipeline, match_resume_to_jds, register_jd, load_registered_jd
+from embedding.resume_embedding import sanitize_collection_name
+from embedding.batch import encode_texts
+from embedding.talent_pool import CANDIDATE_COLLECTION, JD_COLLECTION, SEARCH_FIELDS, get_document_vectors, search
+from utils.db import (
+    ResultWriter, find_jd_by_hash, get_jd, get_leaderboard, get_results_page, run_db, save_jd,
+)
+from utils.validation import validate_analysis, score_fields
 from utils.helper import serialize_mongo
 from utils.email_utils import send_email
+from utils.jobs import job_manager
+from utils.uploads import (
+    JD_EXTENSIONS, MAX_REQUEST_BYTES, RESUME_EXTENSIONS, UPLOAD_MAX_REQUEST_MB, UploadError, discard_folder,
+    file_digest, save_uploads,
+)
 from bson import ObjectId
+from bson.errors import InvalidId
 
 app = FastAPI()
 
@@ -20,95 +32,483 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Job-Id", "X-Total-Count", "X-Next-Cursor"],
 )
 
+UPLOAD_PATHS = {"/run-pipeline", "/run-pipeline/stream", "/run-matrix", "/match-jds", "/jds"}
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Refuse on the declared size before the multipart body is read at all;
+    # chunked bodies without a Content-Length are capped while they are saved.
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BYTES:
+            return JSONResponse(
+                content={"status": "error", "message": f"Request body exceeds the {UPLOAD_MAX_REQUEST_MB:g} MB per-request limit"},
+                status_code=413,
+            )
+    return await call_next(request)
+
+def upload_error_response(error):
+    print(f"[WARNING] Upload rejected: {error}")
+    return JSONResponse(content={"status": "error", "message": str(error)}, status_code=error.status_code)
+
+def build_record(name, email, jd_filename, resume_filename, result_key, raw_analysis, details=None):
+    analysis = validate_analysis(raw_analysis)
+    details = details or {}
+    scores = score_fields(analysis)
+
+    shortlisted_flag = "yes" if scores["shortlisted"] else "no"
+
+    return {
+        "name": name,
+        "email": email,
+        "jd": jd_filename,
+        "resume": resume_filename,
+        "result": {
+            result_key: analysis,
+            "shortlisted": shortlisted_flag
+        },
+        "candidate_id": details.get("candidate_id"),
+        "jd_id": details.get("jd_id"),
+        "embedding_score": details.get("embedding_score"),
+        "decided_by": details.get("decided_by", "llm"),
+        # Indexable copies of the scores above; `result` keeps the legacy shape for the frontend
+        **scores,
+    }
+
+def run_pipeline_job(job, resume_folder, jd_folder, name, email, jd_filenames, resume_filenames,
+                     top_k=None, min_similarity=None, scoring_mode="llm", jd_fields=None, temp_dir=None):
+    resume_lookup = {sanitize_collection_name(f): f for f in resume_filenames}
+    jd_lookup = {sanitize_collection_name(f): f for f in jd_filenames}
+    writer = ResultWriter()
+
+    def on_result(resume_id, jd_id, parsed, details=None):
+        result_key = f"{resume_id}_vs_{jd_id}"
+        raw_analysis = parsed.get(result_key)
+        if raw_analysis is None and len(parsed) == 1:
+            raw_analysis = next(iter(parsed.values()))
+
+        record = build_record(
+            name, email,
+            jd_lookup.get(jd_id, jd_id),
+            resume_lookup.get(resume_id, resume_id),
+            result_key,
+            raw_analysis or {},
+            details,
+        )
+        writer.add(record)
+        job.add_record(record)
+
+    try:
+        run_pipeline(
+            resume_folder, jd_folder,
+            progress=job.set_stage, on_result=on_result,
+            top_k=top_k, min_similarity=min_similarity,
+            scoring_mode=scoring_mode,
+            jd_fields=jd_fields,
+        )
+    finally:
+        try:
+            writer.close()
+        finally:
+            # Uploaded resumes carry personal data; nothing is kept once the run is over
+            if temp_dir:
+                discard_folder(temp_dir)
+
+def persist_uploads(jd_files, resume_files):
+    temp_dir = tempfile.mkdtemp()
+    resume_folder = os.path.join(temp_dir, "resumes")
+    jd_folder = os.path.join(temp_dir, "jd")
+
+    try:
+        (jd_filenames, resume_filenames), (jd_duplicates, resume_duplicates) = save_uploads([
+            (jd_files, jd_folder, JD_EXTENSIONS),
+            (resume_files, resume_folder, RESUME_EXTENSIONS),
+        ])
+    except Exception:
+        discard_folder(temp_dir)
+        raise
+
+    duplicates = {"jds": jd_duplicates, "resumes": resume_duplicates}
+    return temp_dir, resume_folder, jd_folder, jd_filenames, resume_filenames, duplicates
+
+def submit_pipeline_job(temp_dir, resume_folder, jd_folder, name, email, jd_filenames, resume_filenames,
+                        top_k, min_similarity, scoring_mode, listeners=None, matrix=False, duplicates=None,
+                        jd_id=None, jd_fields=None):
+    # Uploads whose content repeated an earlier file were dropped; report them instead of losing them silently
+    meta = {"resumes": len(resume_filenames), "top_k": top_k, "scoring_mode": scoring_mode,
+            "duplicates": duplicates or {}}
+    if matrix:
+        meta.update({"jds": jd_filenames, "resume_files": resume_filenames})
+    else:
+        meta["jd"] = jd_filenames[0]
+    if jd_id:
+        meta["jd_id"] = jd_id
+    return job_manager.submit(
+        run_pipeline_job,
+        resume_folder, jd_folder, name, email,
+        jd_filenames, resume_filenames,
+        top_k=top_k, min_similarity=min_similarity, scoring_mode=scoring_mode, jd_fields=jd_fields,
+        temp_dir=temp_dir,
+        meta=meta,
+        listeners=listeners,
+    )
+
+async def prepare_pipeline_inputs(jd, jd_id, resumes):
+    """
+    Save the uploads and resolve `jd_id` against the JD registry.
+
+    Returns (inputs, error_response) with exactly one of them None; inputs are
+    (temp_dir, resume_folder, jd_folder, jd_filenames, resume_filenames, jd_fields, duplicates).
+    """
+    if (jd is None) == (not jd_id):
+        return None, JSONResponse(content={"status": "error", "message": "Provide either a jd file or a jd_id"}, status_code=400)
+
+    jd_fields = None
+    if jd_id:
+        registered = await run_db(get_jd, jd_id)
+        if registered is None:
+            return None, JSONResponse(content={"status": "error", "message": "JD not found in registry"}, status_code=404)
+        jd_fields = await run_in_threadpool(load_registered_jd, registered)
+
+    temp_dir, resume_folder, jd_folder, jd_filenames, resume_filenames, duplicates = await run_in_threadpool(
+        persist_uploads, [jd] if jd is not None else [], resumes
+    )
+    if jd_id:
+        jd_filenames = [registered["filename"]]
+    return (temp_dir, resume_folder, jd_folder, jd_filenames, resume_filenames, jd_fields, duplicates), None
+
 @app.post("/run-pipeline")
 async def trigger_pipeline_from_uploads(
-    background_tasks: BackgroundTasks,
     name: str = Form(...),
     email: str = Form(...),
-    jd: UploadFile = File(...),
+    jd: Optional[UploadFile] = File(None),
+    jd_id: Optional[str] = Form(None),
     resumes: List[UploadFile] = File(...),
+    top_k: Optional[int] = Form(None, ge=1),
+    min_similarity: Optional[float] = Form(None, ge=-1, le=1),
+    scoring_mode: Literal["llm", "fast"] = Form("llm"),
 ):
     try:
-        temp_dir = tempfile.mkdtemp()
-        resume_folder = os.path.join(temp_dir, "resumes")
-        jd_folder = os.path.join(temp_dir, "jd")
+        inputs, error = await prepare_pipeline_inputs(jd, jd_id, resumes)
+        if error is not None:
+            return error
+        temp_dir, resume_folder, jd_folder, jd_filenames, resume_filenames, jd_fields, duplicates = inputs
 
-        os.makedirs(resume_folder, exist_ok=True)
-        os.makedirs(jd_folder, exist_ok=True)
+        job = submit_pipeline_job(
+            temp_dir, resume_folder, jd_folder, name, email, jd_filenames, resume_filenames,
+            top_k, min_similarity, scoring_mode, duplicates=duplicates, jd_id=jd_id, jd_fields=jd_fields,
+        )
 
-        jd_path = os.path.join(jd_folder, jd.filename)
-        with open(jd_path, "wb") as f:
-            f.write(await jd.read())
+        return JSONResponse(
+            content={
+                "status": "accepted",
+                "message": "Pipeline job queued",
+                "job_id": job.id,
+                "duplicates": duplicates,
+            },
+            status_code=202,
+        )
 
-        resume_paths = []
-        for resume in resumes:
-            resume_path = os.path.join(resume_folder, resume.filename)
-            with open(resume_path, "wb") as f:
-                f.write(await resume.read())
-            resume_paths.append(resume_path)
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        print("[ERROR] Pipeline failed:", e)
+        return JSONResponse(
+            content={"status": "error", "message": str(e)},
+            status_code=500
+        )
 
-        results = run_pipeline(resume_folder, jd_folder)
+def format_event(event, sse):
+    payload = json.dumps(serialize_mongo(event))
+    if sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
 
-        saved_records = []
+@app.post("/run-pipeline/stream")
+async def stream_pipeline_from_uploads(
+    request: Request,
+    name: str = Form(...),
+    email: str = Form(...),
+    jd: Optional[UploadFile] = File(None),
+    jd_id: Optional[str] = Form(None),
+    resumes: List[UploadFile] = File(...),
+    top_k: Optional[int] = Form(None, ge=1),
+    min_similarity: Optional[float] = Form(None, ge=-1, le=1),
+    scoring_mode: Literal["llm", "fast"] = Form("llm"),
+):
+    """Run the pipeline and stream stage progress and each validated record as it completes."""
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    try:
+        inputs, error = await prepare_pipeline_inputs(jd, jd_id, resumes)
+        if error is not None:
+            return error
+        temp_dir, resume_folder, jd_folder, jd_filenames, resume_filenames, jd_fields, duplicates = inputs
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        print("[ERROR] Pipeline failed:", e)
+        return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
 
-        for resume_file, result_dict in zip(resumes, results):
-            resume_name = os.path.splitext(resume_file.filename)[0].replace(" ", "_")
-            jd_name = os.path.splitext(jd.filename)[0].replace(" ", "_")
-            result_key = f"{resume_name}_vs_{jd_name}"
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
 
-            raw_analysis = result_dict.get(result_key, {})
-            analysis = validate_analysis(raw_analysis)
+    # Job events fire on the worker thread; hand them to the event loop safely
+    def listener(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
 
-            overall_score = analysis.get("OverallMatchPercentage", 0)
-            shortlisted_flag = "yes" if overall_score > 60 else "no"
+    job = submit_pipeline_job(
+        temp_dir, resume_folder, jd_folder, name, email, jd_filenames, resume_filenames,
+        top_k, min_similarity, scoring_mode, listeners=[listener], duplicates=duplicates,
+        jd_id=jd_id, jd_fields=jd_fields,
+    )
 
-            record = {
-                "name": name,
-                "email": email,
-                "jd": jd.filename,
-                "resume": resume_file.filename,
-                "result": {
-                    result_key: analysis,
-                    "shortlisted": shortlisted_flag
-                }
-            }
+    async def event_stream():
+        yield format_event({"event": "job", **job.to_dict()}, sse)
+        while True:
+            event = await events.get()
+            yield format_event(event, sse)
+            if event["event"] == "done":
+                break
 
-            record_id = save_result(record)
-            record["_id"] = record_id
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"X-Job-Id": job.id, "Cache-Control": "no-cache"},
+    )
 
-            saved_records.append(record)
+@app.post("/run-matrix")
+async def trigger_matrix_from_uploads(
+    name: str = Form(...),
+    email: str = Form(...),
+    jds: List[UploadFile] = File(...),
+    resumes: List[UploadFile] = File(...),
+    top_k: Optional[int] = Form(None, ge=1),
+    min_similarity: Optional[float] = Form(None, ge=-1, le=1),
+    scoring_mode: Literal["llm", "fast"] = Form("llm"),
+):
+    """Score many resumes against many JDs in one job; each document is extracted and embedded once."""
+    try:
+        temp_dir, resume_folder, jd_folder, jd_filenames, resume_filenames, duplicates = await run_in_threadpool(
+            persist_uploads, jds, resumes
+        )
+
+        job = submit_pipeline_job(
+            temp_dir, resume_folder, jd_folder, name, email, jd_filenames, resume_filenames,
+            top_k, min_similarity, scoring_mode, matrix=True, duplicates=duplicates,
+        )
 
         return JSONResponse(
-            content=serialize_mongo({
-                "status": "success",
-                "message": "Processed successfully",
-                "records": saved_records
-            }),
-            status_code=200,
+            content={
+                "status": "accepted",
+                "message": "Matrix job queued",
+                "job_id": job.id,
+                "jds": jd_filenames,
+                "resumes": resume_filenames,
+                "duplicates": duplicates,
+            },
+            status_code=202,
         )
 
+    except UploadError as e:
+        return upload_error_response(e)
     except Exception as e:
-        print("[ERROR] Pipeline failed:", e)
+        print("[ERROR] Matrix pipeline failed:", e)
+        return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
+
+def build_matrix(records, jd_filenames, resume_filenames):
+    """Summarise a job's records as rows per resume and columns per JD; unscored cells are None."""
+    cells = {resume: {jd: None for jd in jd_filenames} for resume in resume_filenames}
+    for record in records:
+        cells.setdefault(record["resume"], {})[record["jd"]] = {
+            "result_id": str(record.get("_id")),
+            "overall_score": record.get("overall_score"),
+            "shortlisted": record.get("shortlisted"),
+            "decided_by": record.get("decided_by"),
+        }
+    return cells
+
+@app.get("/jobs/{job_id}/matrix")
+async def get_job_matrix(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(content={"status": "error", "message": "Job not found"}, status_code=404)
+
+    payload = job.to_dict()
+    jd_filenames = payload["meta"].get("jds") or [payload["meta"].get("jd")]
+    resume_filenames = payload["meta"].get("resume_files") or []
+    payload["matrix"] = build_matrix(job.get_records(), jd_filenames, resume_filenames)
+    return payload
+
+@app.get("/jobs/{job_id}/cells/{resume}/{jd}")
+async def get_job_cell(job_id: str, resume: str, jd: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(content={"status": "error", "message": "Job not found"}, status_code=404)
+
+    # A dropped duplicate upload is answered with the cell of the file it duplicated
+    duplicates = job.meta.get("duplicates") or {}
+    resume = duplicates.get("resumes", {}).get(resume, resume)
+    jd = duplicates.get("jds", {}).get(jd, jd)
+    for record in job.get_records():
+        if record["resume"] == resume and record["jd"] == jd:
+            return JSONResponse(content=serialize_mongo(record), status_code=200)
+    return JSONResponse(content={"status": "error", "message": "Cell not scored (yet)"}, status_code=404)
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(content={"status": "error", "message": "Job not found"}, status_code=404)
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(content={"status": "error", "message": "Job not found"}, status_code=404)
+
+    payload = job.to_dict()
+    payload["records"] = job.get_records()
+    return JSONResponse(content=serialize_mongo(payload), status_code=200)
+
+@app.get("/search")
+def search_talent_pool(
+    jd_id: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, min_length=1),
+    top_k: int = Query(10, ge=1, le=100),
+    fields: Optional[List[str]] = Query(None),
+):
+    try:
+        start = time.time()
+        unknown = set(fields or []) - set(SEARCH_FIELDS)
+        if unknown:
+            return JSONResponse(
+                content={"status": "error", "message": f"Unknown field(s): {sorted(unknown)}, expected {SEARCH_FIELDS}"},
+                status_code=400,
+            )
+
+        jd_name = None
+        if jd_id:
+            jd_name, query_vectors = get_document_vectors(JD_COLLECTION, jd_id)
+            if not query_vectors:
+                return JSONResponse(content={"status": "error", "message": "JD not found in talent pool"}, status_code=404)
+        elif q:
+            vector = encode_texts([q])[0].tolist()
+            query_vectors = {field: vector for field in SEARCH_FIELDS}
+        else:
+            return JSONResponse(content={"status": "error", "message": "Provide jd_id or q"}, status_code=400)
+
+        candidates = search(CANDIDATE_COLLECTION, query_vectors, top_k=top_k, fields=fields or SEARCH_FIELDS)
+        return {
+            "status": "success",
+            "jd_id": jd_id,
+            "jd": jd_name,
+            "took_ms": round((time.time() - start) * 1000, 1),
+            "candidates": candidates,
+        }
+
+    except Exception as e:
+        print("[ERROR] Talent pool search failed:", e)
+        return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
+
+@app.post("/match-jds")
+def match_jds_for_resume(
+    resume: UploadFile = File(...),
+    top_k: int = Form(10, ge=1, le=100),
+    llm_top_n: int = Form(0, ge=0, le=10),
+):
+    temp_dir = tempfile.mkdtemp()
+    try:
+        [[filename]], _ = save_uploads([([resume], temp_dir, RESUME_EXTENSIONS)])
+        resume_path = os.path.join(temp_dir, filename)
+
+        result = match_resume_to_jds(resume_path, top_k=top_k, llm_top_n=llm_top_n)
+        return {"status": "success", **result}
+
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        print("[ERROR] JD matching failed:", e)
+        return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
+    finally:
+        discard_folder(temp_dir)
+
+@app.post("/jds")
+def register_job_description(jd: UploadFile = File(...)):
+    """Parse, embed and store a JD once so pipeline runs can reference it by jd_id."""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        [[filename]], _ = save_uploads([([jd], temp_dir, JD_EXTENSIONS)])
+        jd_path = os.path.join(temp_dir, filename)
+        content_hash = file_digest(jd_path)
+
+        existing = find_jd_by_hash(content_hash)
+        if existing is not None:
+            return {"status": "success", "created": False, "jd_id": existing["_id"], "name": existing["name"],
+                    "filename": existing["filename"], "fields": existing["fields"]}
+
+        registered = register_jd(jd_path)
+        registered.update({"content_hash": content_hash, "created_at": time.time()})
+        save_jd(registered)
         return JSONResponse(
-            content={"status": "error", "message": str(e)},
-            status_code=500
+            content={"status": "success", "created": True, "jd_id": registered["_id"], "name": registered["name"],
+                     "filename": registered["filename"], "fields": registered["fields"]},
+            status_code=201,
         )
-        
-@app.get("/history")
-async def get_history(page: int = Query(1, ge=1), limit: int = Query(8, ge=1)):
+
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        print("[ERROR] JD registration failed:", e)
+        return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
+    finally:
+        discard_folder(temp_dir)
+
+@app.get("/jds/{jd_id}")
+async def get_job_description(jd_id: str):
+    registered = await run_db(get_jd, jd_id)
+    if registered is None:
+        return JSONResponse(content={"status": "error", "message": "JD not found in registry"}, status_code=404)
+    registered["jd_id"] = registered.pop("_id")
+    return {"status": "success", **registered}
+
+@app.get("/jds/{jd_id}/leaderboard")
+async def get_jd_leaderboard(
+    jd_id: str,
+    limit: int = Query(20, ge=1, le=200),
+    shortlisted_only: bool = Query(False),
+):
     try:
-        results = get_all_results()
-        total = len(results)
+        leaderboard = await run_db(get_leaderboard, jd_id, limit=limit, shortlisted_only=shortlisted_only)
+        if leaderboard is None:
+            return JSONResponse(content={"status": "error", "message": "No results for this JD"}, status_code=404)
+        return {"status": "success", "jd_id": jd_id, **leaderboard}
 
-        start = (page - 1) * limit
-        end = start + limit
-        paginated = results[start:end]
+    except Exception as e:
+        print("[ERROR] Leaderboard failed:", e)
+        return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
+
+@app.get("/history")
+async def get_history(
+    page: int = Query(1, ge=1),
+    limit: int = Query(8, ge=1, le=100),
+    before: Optional[str] = Query(None, description="last _id of the previous page, for keyset paging"),
+    email: Optional[str] = Query(None),
+):
+    try:
+        results, total = await run_db(get_results_page, limit, page=page, before=before, email=email)
 
-        formatted = [r.get("result", {}) for r in paginated]
+        formatted = [r.get("result", {}) for r in results]
 
-        return formatted
+        headers = {"X-Total-Count": str(total)}
+        if len(results) == limit:
+            headers["X-Next-Cursor"] = str(results[-1]["_id"])
+        return JSONResponse(content=formatted, headers=headers)
 
+    except InvalidId:
+        return JSONResponse(content={"status": "error", "message": "Invalid cursor"}, status_code=400)
     except Exception as e:
         return {"status": "error", "message": str(e)}
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+# Writes between exact recounts of a cache's size; in between a running total is kept,
+# so a write never scans the table. The recount also picks up writes by other processes.
+CACHE_RECOUNT_EVERY = int(os.getenv("CACHE_RECOUNT_EVERY", 1000))
+
+def hash_key(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+def prompt_version(*prompts) -> str:
+    """Short fingerprint of prompt text, so editing a prompt invalidates cached answers."""
+    return hash_key(*prompts)[:12]
+
+class SQLiteCache:
+    """Persistent JSON key/value cache with hit/miss counters, optional TTL and LRU eviction by total size."""
+
+    def __init__(self, path, max_bytes, ttl=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self._total_bytes = self._count_bytes()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at, size FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and self.ttl and row[1] + self.ttl < now:
+                with self._conn:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total_bytes -= row[2]
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now),
+                )
+            self._total_bytes += len(payload) - (old[0] if old else 0)
+            self._evict()
+
+    def _count_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self):
+        self._writes += 1
+        if self._writes >= CACHE_RECOUNT_EVERY:
+            # Expired entries are otherwise only dropped when read
+            if self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,))
+            self._total_bytes = self._count_bytes()
+            self._writes = 0
+        if self._total_bytes <= self.max_bytes:
+            return
+        excess = self._total_bytes - self.max_bytes
+        removed = 0
+        keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC"):
+            keys.append(key)
+            removed += size
+            if removed >= excess:
+                break
+        with self._conn:
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+        self._total_bytes -= removed
+        print(f"[INFO] Evicted {len(keys)} entr{'y' if len(keys) == 1 else 'ies'} from cache {self.path}")
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+                "bytes": size,
+            }
@@ -1,17 +1,281 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import threading
+import time
 import os
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "resume_shortlister")
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-collection = db["results"]
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+# "majority", or the number of acknowledging members; "0" means fire-and-forget
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "1")
+# Threads that run blocking driver calls on behalf of async routes
+MONGO_EXECUTOR_WORKERS = int(os.getenv("MONGO_EXECUTOR_WORKERS", 8))
+
+RESULT_BATCH_SIZE = int(os.getenv("RESULT_BATCH_SIZE", 50))
+RESULT_FLUSH_SECONDS = float(os.getenv("RESULT_FLUSH_SECONDS", 2))
+# Attempts close() makes at a batch that keeps failing before giving up on the run
+RESULT_WRITE_RETRIES = int(os.getenv("RESULT_WRITE_RETRIES", 3))
+
+DUPLICATE_KEY_ERROR = 11000
+
+_client = None
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=MONGO_EXECUTOR_WORKERS, thread_name_prefix="mongo")
+
+def get_client():
+    """Process-wide client, created on first use so importing the app never blocks on Mongo."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                w = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    w=w,
+                )
+    return _client
+
+def get_db():
+    return get_client()[DB_NAME]
+
+def get_collection():
+    return get_db()["results"]
+
+def get_jds_collection():
+    return get_db()["jds"]
+
+def __getattr__(name):
+    # Keeps `from utils.db import db, collection` working without connecting at import
+    if name == "client":
+        return get_client()
+    if name == "db":
+        return get_db()
+    if name == "collection":
+        return get_collection()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking data-access call on the Mongo executor so the event loop stays free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
 
 def save_result(record: dict):
-    result = collection.insert_one(record)
+    result = get_collection().insert_one(record)
     return str(result.inserted_id)
 
+def save_results(records):
+    """Insert many records in one round trip; returns their ids as strings."""
+    if not records:
+        return []
+    result = get_collection().insert_many(records, ordered=False)
+    return [str(_id) for _id in result.inserted_ids]
+
 def get_all_results():
-    results = list(collection.find({}, {"_id": 0}))
-    return results
\ No newline at end of file
+    results = list(get_collection().find({}, {"_id": 0}))
+    return results
+
+class ResultWriter:
+    """
+    Buffers a pipeline's records and writes them with insert_many.
+
+    Ids are assigned client-side in add(), so a record can be streamed to the
+    caller before its batch is written. A batch goes out once it holds
+    RESULT_BATCH_SIZE records or its oldest record is RESULT_FLUSH_SECONDS old.
+    A batch that fails to write stays buffered and is retried on a later flush;
+    call close() to write the remainder, which raises if records still could not
+    be saved.
+    """
+
+    def __init__(self, batch_size=RESULT_BATCH_SIZE, flush_seconds=RESULT_FLUSH_SECONDS,
+                 retries=RESULT_WRITE_RETRIES):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.retries = retries
+        self.pending = []
+        self.oldest = None
+        self.retry_at = 0
+        self.error = None
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        record.setdefault("_id", ObjectId())
+        with self._lock:
+            self.pending.append(record)
+            self.oldest = self.oldest or time.time()
+            now = time.time()
+            due = len(self.pending) >= self.batch_size or now - self.oldest >= self.flush_seconds
+            # After a failed write, hold off instead of blocking every add on a database that is down
+            batch = self._take() if due and now >= self.retry_at else []
+        self._write(batch)
+        return record["_id"]
+
+    def close(self):
+        for attempt in range(self.retries):
+            if attempt:
+                time.sleep(self.flush_seconds)
+            with self._lock:
+                batch = self._take()
+            self._write(batch)
+            with self._lock:
+                if not self.pending:
+                    return self.written
+        with self._lock:
+            unsaved, error = len(self.pending), self.error
+        raise RuntimeError(f"{unsaved} result(s) could not be saved: {error}")
+
+    def _take(self):
+        batch, self.pending, self.oldest = self.pending, [], None
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            save_results(batch)
+            failed, error = [], None
+        except BulkWriteError as e:
+            # Records stored by an earlier attempt come back as duplicate keys; those are done
+            failed_at = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY_ERROR}
+            failed, error = [record for i, record in enumerate(batch) if i in failed_at], e
+        except Exception as e:
+            failed, error = batch, e
+
+        with self._lock:
+            self.written += len(batch) - len(failed)
+            if failed:
+                # Back at the front, so the retry keeps the original order
+                self.pending[:0] = failed
+                self.oldest = time.time()
+                self.retry_at = time.time() + self.flush_seconds
+                self.error = error
+        if failed:
+            print(f"[WARNING] Saving {len(failed)} result(s) failed, will retry: {error}")
+        else:
+            print(f"[INFO] Saved {len(batch)} result(s) in one batch")
+
+# /history only renders the analysis, so nothing else is read off disk
+HISTORY_PROJECTION = {"result": 1}
+
+_indexes_ready = False
+
+def ensure_indexes():
+    """Create the indexes the read paths rely on; cheap no-op once they exist."""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    collection = get_collection()
+    existing = collection.index_information()
+    # The _id tiebreak lets the leaderboard sort come straight off the index
+    indexes = {
+        "email_newest": [("email", ASCENDING), ("_id", DESCENDING)],
+        "jd_leaderboard": [("jd_id", ASCENDING), ("overall_score", DESCENDING), ("_id", DESCENDING)],
+        "jd_shortlist": [
+            ("jd_id", ASCENDING), ("shortlisted", ASCENDING), ("overall_score", DESCENDING), ("_id", DESCENDING),
+        ],
+        "candidate_best": [("candidate_id", ASCENDING), ("overall_score", DESCENDING)],
+    }
+    for name, keys in indexes.items():
+        # An index built under the same name with older keys would make create_index fail
+        if name in existing and list(existing[name]["key"]) != keys:
+            collection.drop_index(name)
+        collection.create_index(keys, name=name)
+    get_jds_collection().create_index("content_hash", name="jd_content_hash")
+    _indexes_ready = True
+
+def get_results_page(limit, page=1, before=None, email=None, projection=HISTORY_PROJECTION):
+    """
+    Return (records, total) for one page of results, newest first.
+
+    `before` is the last _id of the previous page; when given, the page is read
+    by keyset on the _id index instead of skipping over every earlier record.
+    """
+    ensure_indexes()
+    collection = get_collection()
+    query = {"email": email} if email else {}
+    # The unfiltered total comes from collection metadata instead of a scan
+    total = collection.count_documents(query) if query else collection.estimated_document_count()
+
+    if before:
+        query["_id"] = {"$lt": ObjectId(before)}
+    cursor = collection.find(query, projection).sort("_id", DESCENDING)
+    if not before:
+        cursor = cursor.skip((page - 1) * limit)
+    return list(cursor.limit(limit)), total
+
+LEADERBOARD_FIELDS = [
+    "name", "email", "jd", "resume", "candidate_id", "overall_score",
+    "section_scores", "shortlisted", "decided_by", "embedding_score",
+]
+
+def get_leaderboard(jd_id, limit=20, shortlisted_only=False):
+    """
+    Rank the candidates scored against one JD, best first, inside Mongo.
+
+    A candidate scored in several runs appears once, with their best result.
+    Returns {"candidates": [...], "stats": {...}} or None if the JD has no results.
+    """
+    ensure_indexes()
+    match = {"jd_id": jd_id}
+    if shortlisted_only:
+        match["shortlisted"] = True
+
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"overall_score": -1, "_id": -1}},
+        # Only the reported fields go through the group, not each record's full analysis
+        {"$project": {field: 1 for field in LEADERBOARD_FIELDS}},
+        {"$group": {
+            # Records written before candidate ids existed fall back to the resume file name
+            "_id": {"$ifNull": ["$candidate_id", "$resume"]},
+            "best": {"$first": "$$ROOT"},
+            "runs": {"$sum": 1},
+        }},
+        {"$facet": {
+            "candidates": [
+                {"$sort": {"best.overall_score": -1, "best._id": -1}},
+                {"$limit": limit},
+                {"$project": {
+                    "_id": 0,
+                    "result_id": {"$toString": "$best._id"},
+                    "runs": 1,
+                    **{field: f"$best.{field}" for field in LEADERBOARD_FIELDS},
+                }},
+            ],
+            "stats": [
+                {"$group": {
+                    "_id": None,
+                    "candidates": {"$sum": 1},
+                    "shortlisted": {"$sum": {"$cond": ["$best.shortlisted", 1, 0]}},
+                    "average_score": {"$avg": "$best.overall_score"},
+                }},
+                {"$project": {"_id": 0}},
+            ],
+        }},
+    ]
+    [page] = list(get_collection().aggregate(pipeline))
+    if not page["stats"] or not page["stats"][0]["candidates"]:
+        return None
+    return {"candidates": page["candidates"], "stats": page["stats"][0]}
+
+def save_jd(record):
+    """Insert or refresh a JD registry entry; its _id is the talent-pool JD id."""
+    ensure_indexes()
+    get_jds_collection().replace_one({"_id": record["_id"]}, record, upsert=True)
+    return record["_id"]
+
+def get_jd(jd_id):
+    return get_jds_collection().find_one({"_id": jd_id})
+
+def find_jd_by_hash(content_hash):
+    ensure_indexes()
+    return get_jds_collection().find_one({"content_hash": content_hash})
\ No newline at end of file
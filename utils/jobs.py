@@ -0,0 +1,113 @@
+import os
+import time
+import uuid
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+PIPELINE_STAGES = ["extraction", "embedding", "comparison"]
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", 200))
+
+
+class Job:
+    """State of one queued pipeline run, shared between the worker and the API."""
+
+    def __init__(self, meta=None, listeners=None):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.stages = {stage: "pending" for stage in PIPELINE_STAGES}
+        self.records = []
+        self.error = None
+        self.meta = meta or {}
+        self.created_at = time.time()
+        self.finished_at = None
+        self._listeners = list(listeners or [])
+        self._lock = threading.Lock()
+
+    def _notify(self, event):
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"[WARNING] Job {self.id} listener failed: {e}")
+
+    def set_stage(self, stage, status):
+        with self._lock:
+            self.stages[stage] = status
+        self._notify({"event": "stage", "stage": stage, "status": status})
+
+    def add_record(self, record):
+        with self._lock:
+            self.records.append(record)
+        self._notify({"event": "result", "record": record})
+
+    def finish(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+        self._notify({"event": "done", "status": status, "error": error})
+
+    def get_records(self):
+        with self._lock:
+            return list(self.records)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stages": dict(self.stages),
+                "completed_records": len(self.records),
+                "error": self.error,
+                "meta": self.meta,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """Runs pipeline jobs on a worker pool so request handlers return immediately."""
+
+    def __init__(self, max_workers=JOB_WORKERS, retention=JOB_RETENTION):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-job")
+        self.retention = retention
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, meta=None, listeners=None, **kwargs):
+        job = Job(meta, listeners)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._evict_finished()
+        self.executor.submit(self._run, job, func, *args, **kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job, func, *args, **kwargs):
+        job.status = "running"
+        try:
+            func(job, *args, **kwargs)
+            job.finish("completed")
+        except Exception as e:
+            print(f"[ERROR] Job {job.id} failed: {e}")
+            traceback.print_exc()
+            job.finish("failed", str(e))
+
+    def _evict_finished(self):
+        if len(self.jobs) <= self.retention:
+            return
+        finished = sorted(
+            (j for j in self.jobs.values() if j.finished_at is not None),
+            key=lambda j: j.finished_at,
+        )
+        for job in finished[:len(self.jobs) - self.retention]:
+            del self.jobs[job.id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,76 @@
+"""
+Backfill the normalized score fields on results stored before they existed.
+
+Adds overall_score, section_scores and a boolean shortlisted from the analysis
+under each record's dynamic `<resume>_vs_<jd>` key, and a `legacy-<jd name>`
+jd_id where none was recorded, then creates the indexes the leaderboard uses.
+
+    python -m utils.migrate_results --dry-run
+    python -m utils.migrate_results
+"""
+import os
+import re
+import argparse
+from pymongo import UpdateOne
+from utils.db import ensure_indexes, get_collection
+from utils.validation import find_analysis, score_fields, validate_analysis
+
+MIGRATION_BATCH_SIZE = 500
+
+def legacy_jd_id(jd_filename):
+    slug = re.sub(r"[^a-z0-9]+", "-", os.path.splitext(jd_filename or "")[0].lower()).strip("-")
+    return f"legacy-{slug or 'unknown'}"
+
+def migration_update(doc):
+    """Return the $set for one stored record, or None if it has no analysis to derive scores from."""
+    analysis = find_analysis(doc.get("result"))
+    if analysis is None:
+        return None
+    update = score_fields(validate_analysis(analysis))
+    if not doc.get("jd_id"):
+        update["jd_id"] = legacy_jd_id(doc.get("jd"))
+    return update
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    args = parser.parse_args()
+
+    collection = get_collection()
+    cursor = collection.find(
+        {"overall_score": {"$exists": False}},
+        {"result": 1, "jd": 1, "jd_id": 1},
+        no_cursor_timeout=True,
+    ).batch_size(args.batch_size)
+
+    scanned = migrated = skipped = 0
+    pending = []
+    try:
+        for doc in cursor:
+            scanned += 1
+            update = migration_update(doc)
+            if update is None:
+                skipped += 1
+                continue
+            pending.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+            if len(pending) >= args.batch_size:
+                if not args.dry_run:
+                    collection.bulk_write(pending, ordered=False)
+                migrated += len(pending)
+                pending = []
+                print(f"[INFO] Migrated {migrated} record(s) so far")
+        if pending:
+            if not args.dry_run:
+                collection.bulk_write(pending, ordered=False)
+            migrated += len(pending)
+    finally:
+        cursor.close()
+
+    if not args.dry_run:
+        ensure_indexes()
+    action = "Would migrate" if args.dry_run else "Migrated"
+    print(f"[SUCCESS] {action} {migrated} of {scanned} legacy record(s); {skipped} had no analysis")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import os
+import re
+import math
+
+# No tokenizer ships with the app, so budgets use a characters-per-token estimate;
+# ~4 is typical for English with Llama-family tokenizers. Actual counts are logged
+# from the inference response whenever the endpoint reports usage.
+PROMPT_CHARS_PER_TOKEN = float(os.getenv("PROMPT_CHARS_PER_TOKEN", 4))
+
+LIST_SEPARATOR = "; "
+# Sent in place of a section trimmed away entirely; an empty value reads as "has none"
+TRIMMED_MARKER = "(trimmed)"
+
+def estimate_tokens(text):
+    return int(math.ceil(len(text) / PROMPT_CHARS_PER_TOKEN)) if text else 0
+
+def compact_prompt(text):
+    """Strip trailing spaces and collapse blank-line runs; the model does not need the layout."""
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{2,}", "\n", text)
+    return text.strip()
+
+def trim_text(text, max_tokens, separator=None):
+    """
+    Shorten `text` to about `max_tokens`.
+
+    With a `separator` whole trailing list items are dropped first and the cut is
+    noted; otherwise, or if a single item is still too long, the text is cut at
+    a word boundary. Text that cannot keep anything becomes TRIMMED_MARKER.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return TRIMMED_MARKER
+
+    if separator and separator in text:
+        items = text.split(separator)
+        for keep in range(len(items) - 1, 0, -1):
+            candidate = separator.join(items[:keep]) + f"{separator}(+{len(items) - keep} more)"
+            if estimate_tokens(candidate) <= max_tokens:
+                return candidate
+
+    max_chars = int(max_tokens * PROMPT_CHARS_PER_TOKEN) - 3
+    cut = text[:max(max_chars, 0)].rsplit(" ", 1)[0]
+    return cut + "..." if cut else TRIMMED_MARKER
+
+def fit_sections(sections, budget):
+    """
+    Trim prompt sections until their estimated total fits `budget` tokens.
+
+    `sections` is a list of (name, text, priority) or (name, text, priority, floor).
+    The lowest priority tier is trimmed first. Within a tier the longest sections
+    are cut down to a shared length, so a short section keeps its content while a
+    long one still has room to give, and no section drops below `floor` tokens.
+    Returns ({name: text}, tokens_trimmed).
+    """
+    texts = {section[0]: section[1] or "" for section in sections}
+    overflow = sum(estimate_tokens(t) for t in texts.values()) - budget
+    trimmed = 0
+
+    tiers = {}
+    for section in sections:
+        tiers.setdefault(section[2], []).append(section)
+
+    for priority in sorted(tiers):
+        if overflow <= 0:
+            break
+        sizes = {section[0]: estimate_tokens(texts[section[0]]) for section in tiers[priority]}
+        floors = {section[0]: section[3] if len(section) > 3 else 0 for section in tiers[priority]}
+        cap = _shared_cap(sizes, floors, overflow)
+        for name, size in sizes.items():
+            target = max(cap, floors[name])
+            if size <= target:
+                continue
+            texts[name] = trim_text(texts[name], target, separator=LIST_SEPARATOR)
+            saved = size - estimate_tokens(texts[name])
+            overflow -= saved
+            trimmed += saved
+
+    return texts, trimmed
+
+def _shared_cap(sizes, floors, cut):
+    """Largest per-section length that removes at least `cut` tokens, or 0 if the floors do not allow it."""
+    def removed(cap):
+        return sum(max(size - max(cap, floors[name]), 0) for name, size in sizes.items())
+
+    low, high = 0, max(sizes.values(), default=0)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if removed(mid) >= cut:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+def report_tokens(label, messages, response=None, budget=None, trimmed=0):
+    """Log the estimated input size of one call and, when the endpoint returns it, the real usage."""
+    estimated = sum(estimate_tokens(m["content"]) for m in messages)
+    line = f"[INFO] {label}: ~{estimated} input token(s)"
+    if budget:
+        line += f" of {budget} budget"
+    if trimmed:
+        line += f", {trimmed} trimmed"
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        line += f"; endpoint reported {usage.prompt_tokens} prompt + {usage.completion_tokens} completion"
+    print(line)
+    return estimated
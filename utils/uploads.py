@@ -0,0 +1,126 @@
+import os
+import shutil
+import hashlib
+from embedding.resume_embedding import sanitize_collection_name
+from extraction.text_extraction import SUPPORTED_EXTENSIONS
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+UPLOAD_MAX_FILE_MB = float(os.getenv("UPLOAD_MAX_FILE_MB", 20))
+UPLOAD_MAX_REQUEST_MB = float(os.getenv("UPLOAD_MAX_REQUEST_MB", 200))
+
+MAX_FILE_BYTES = int(UPLOAD_MAX_FILE_MB * 1024 * 1024)
+MAX_REQUEST_BYTES = int(UPLOAD_MAX_REQUEST_MB * 1024 * 1024)
+
+# Must match what the parsers accept, otherwise a file is stored and then silently skipped
+RESUME_EXTENSIONS = (".pdf", ".docx")
+JD_EXTENSIONS = SUPPORTED_EXTENSIONS
+
+
+class UploadError(Exception):
+    """An upload was rejected; carries the HTTP status the API should answer with."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def upload_filename(upload, extensions):
+    """Return a safe basename for `upload`, rejecting unsupported types before any bytes are read."""
+    filename = os.path.basename((upload.filename or "").replace("\\", "/"))
+    if filename in ("", ".", ".."):
+        raise UploadError("Uploaded file has no name", 400)
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in extensions:
+        raise UploadError(f"Unsupported file type for {filename}, expected one of {list(extensions)}", 415)
+    return filename
+
+
+def stream_to_disk(upload, path, max_bytes, limit_message):
+    """
+    Copy an upload to `path` one chunk at a time, never holding more than
+    UPLOAD_CHUNK_SIZE in memory. Returns (bytes written, sha256 of the content).
+    """
+    written = 0
+    digest = hashlib.sha256()
+    upload.file.seek(0)
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = upload.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadError(limit_message, 413)
+                digest.update(chunk)
+                f.write(chunk)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written, digest.hexdigest()
+
+
+def unique_filename(filename, taken):
+    """Suffix `filename` until its pipeline document name is unused, so two files never share a collection."""
+    stem, ext = os.path.splitext(filename)
+    candidate, n = filename, 1
+    while sanitize_collection_name(candidate) in taken:
+        n += 1
+        candidate = f"{stem}-{n}{ext}"
+    taken.add(sanitize_collection_name(candidate))
+    return candidate
+
+
+def save_uploads(groups, max_file_bytes=MAX_FILE_BYTES, max_request_bytes=MAX_REQUEST_BYTES):
+    """
+    Write groups of uploads to disk under per-file and per-request size caps.
+
+    `groups` is a list of (uploads, folder, extensions). Every name and type is
+    checked before the first file is written, and a file whose content repeats
+    an earlier one in its group is dropped so it is only processed once.
+    Returns (saved filenames, {dropped filename: kept filename}), each one per group.
+    """
+    names = [[upload_filename(upload, extensions) for upload in uploads] for uploads, _, extensions in groups]
+
+    saved, duplicates = [], []
+    remaining = max_request_bytes
+    for (uploads, folder, _), filenames in zip(groups, names):
+        os.makedirs(folder, exist_ok=True)
+        kept, dropped, taken, seen = [], {}, set(), {}
+        for upload, filename in zip(uploads, filenames):
+            if remaining < max_file_bytes:
+                max_bytes = remaining
+                message = f"Upload exceeds the {UPLOAD_MAX_REQUEST_MB:g} MB per-request limit at {filename}"
+            else:
+                max_bytes = max_file_bytes
+                message = f"{filename} exceeds the {UPLOAD_MAX_FILE_MB:g} MB per-file limit"
+            stored_name = unique_filename(filename, taken)
+            path = os.path.join(folder, stored_name)
+            written, digest = stream_to_disk(upload, path, max_bytes, message)
+            remaining -= written
+            if digest in seen:
+                os.remove(path)
+                dropped[filename] = seen[digest]
+                continue
+            seen[digest] = stored_name
+            kept.append(stored_name)
+        saved.append(kept)
+        duplicates.append(dropped)
+
+    print(f"[INFO] Saved {sum(len(k) for k in saved)} upload(s), {(max_request_bytes - remaining) / 1024 / 1024:.1f} MB"
+          + (f", skipped {sum(len(d) for d in duplicates)} duplicate(s)" if any(duplicates) else ""))
+    return saved, duplicates
+
+
+def discard_folder(folder):
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+def file_digest(path):
+    """sha256 of a saved file, read in UPLOAD_CHUNK_SIZE chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
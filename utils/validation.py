@@ -1,4 +1,9 @@
 # --- Utils ---
+SHORTLIST_THRESHOLD = 60
+
+# Analysis sections mapped to the keys they are stored under in `section_scores`
+SECTION_SCORE_KEYS = {"Skills": "skills", "Education": "education", "Job Role": "job_role", "Experience": "experience"}
+
 def validate_analysis(result: dict) -> dict:
     required_sections = ["Skills", "Education", "Job Role", "Experience"]
     validated = {}
@@ -19,4 +24,30 @@ def validate_analysis(result: dict) -> dict:
         "AI_Generated_Estimate_Percentage", 0
     )
 
-    return validated
\ No newline at end of file
+    return validated
+
+def to_score(value) -> float:
+    """Coerce an LLM-reported percentage such as 85, "85" or "85%" to a float; 0 if unusable."""
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except (TypeError, ValueError):
+        return 0.0
+
+def find_analysis(result: dict):
+    """Return the analysis stored under a record's dynamic `<resume>_vs_<jd>` key, if any."""
+    for value in (result or {}).values():
+        if isinstance(value, dict) and "OverallMatchPercentage" in value:
+            return value
+    return None
+
+def score_fields(analysis: dict) -> dict:
+    """Top-level, indexable score fields for one analysis."""
+    overall_score = to_score(analysis.get("OverallMatchPercentage"))
+    return {
+        "overall_score": overall_score,
+        "section_scores": {
+            key: to_score(analysis.get(section, {}).get("match_pct"))
+            for section, key in SECTION_SCORE_KEYS.items()
+        },
+        "shortlisted": overall_score > SHORTLIST_THRESHOLD,
+    }
\ No newline at end of file